@@ -1,18 +1,41 @@
+import atexit
+import threading
+import time
 from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 from joblib import load
 
+from src.obesity_tc.compact_forest import FlorestaCompacta
+from src.obesity_tc.drift import MonitorDeriva
+from src.obesity_tc.instrumentation import JanelaTempos
 from src.obesity_tc.make_dataset import atualizar_base_ptbr
+from src.obesity_tc.prediction_cache import CachePredicoes
+from src.obesity_tc.registry import (
+    ARQUIVO_FLORESTA,
+    ARQUIVO_MODELO,
+    ARQUIVO_PERFIL,
+    DIRETORIO_MMAP,
+    CarregadorModelo,
+)
+
+# Marca o início do rerun para medir o custo de cada execução do script.
+INICIO_RERUN = time.perf_counter()
 
 st.set_page_config(page_title="Sistema de Predição de Obesidade", layout="wide")
 
 # Caminhos base do projeto para localizar dados e modelo.
 BASE_DIR = Path(__file__).resolve().parent
-CAMINHO_MODELO = BASE_DIR / "models/modelo_obesidade.joblib"
+RAIZ_MODELOS = BASE_DIR / "models"
 CAMINHO_BASE = BASE_DIR / "data/raw/Obesity.csv"
 CAMINHO_BASE_TRADUZIDA = BASE_DIR / "data/processed/base_traduzida_ptbr.csv"
+CAMINHO_ESTADO_DERIVA = BASE_DIR / "models/deriva_app.json"
+# Gravação das contagens do monitor de deriva: a cada N predições pendentes ou,
+# havendo alguma, depois de um intervalo; o resto é gravado ao encerrar. Cada
+# gravação soma só o delta do processo: réplicas do app não se sobrescrevem.
+SALVAR_DERIVA_A_CADA = 20
+SALVAR_DERIVA_INTERVALO_S = 60
 
 # Mapas de tradução para exibição amigável no app.
 MAPA_GENERO = {"Female": "Feminino", "Male": "Masculino"}
@@ -61,22 +84,100 @@ COLUNAS_PT = {
 }
 
 
-@st.cache_resource
-def ler_modelo():
-    if not CAMINHO_MODELO.exists():
+def carregar_versao(diretorio: Path) -> dict:
+    caminho_modelo = diretorio / ARQUIVO_MODELO
+    if not caminho_modelo.exists():
         raise FileNotFoundError(
             "Modelo não encontrado. Treine primeiro com: "
             "python -m src.obesity_tc.train --data data/raw/Obesity.csv --target Obesity"
         )
-    return load(CAMINHO_MODELO)
 
+    def _atualizado(caminho: Path) -> bool:
+        return (
+            caminho.exists()
+            and caminho.stat().st_mtime >= caminho_modelo.stat().st_mtime
+        )
 
-# Garante a base traduzida atualizada para o dashboard.
-atualizar_base_ptbr(
-    data_path=CAMINHO_BASE,
-    output_path=CAMINHO_BASE_TRADUZIDA,
-    coluna_alvo="Obesity",
-)
+    # Versão compacta da floresta (mesmos rótulos, menor latência), se exportada
+    # junto com o modelo. O artefato mapeado em memória tem preferência: carga
+    # quase instantânea e páginas compartilhadas entre processos. Sem nenhuma
+    # das duas, o bundle joblib é lido.
+    if _atualizado(diretorio / DIRETORIO_MMAP / "manifesto.json"):
+        preditor = FlorestaCompacta.mapear(diretorio / DIRETORIO_MMAP)
+    elif _atualizado(diretorio / ARQUIVO_FLORESTA):
+        preditor = FlorestaCompacta.carregar(diretorio / ARQUIVO_FLORESTA)
+    else:
+        preditor = load(caminho_modelo)["pipeline"]
+    return {
+        "preditor": preditor,
+        "caminho_modelo": caminho_modelo,
+        "caminho_perfil": diretorio / ARQUIVO_PERFIL,
+    }
+
+
+@st.cache_resource
+def carregador_modelo() -> CarregadorModelo:
+    # Um carregador por processo: novas versões publicadas pelo train.py entram
+    # em segundo plano, sem reiniciar o app nem segurar predições em andamento.
+    return CarregadorModelo(carregar_versao, RAIZ_MODELOS).iniciar()
+
+
+@st.cache_resource(max_entries=1)
+def ler_cache(caminho_modelo: Path):
+    # Cache de predições compartilhado entre as sessões do processo; uma versão
+    # nova do modelo ganha um cache novo.
+    return CachePredicoes(caminho_modelo)
+
+
+@st.cache_resource
+def sincronizar_base_ptbr() -> threading.Thread:
+    # Garante a base traduzida atualizada para o dashboard uma vez por processo,
+    # em segundo plano: os reruns do formulário não esperam por esse trabalho.
+    tarefa = threading.Thread(
+        target=atualizar_base_ptbr,
+        kwargs={
+            "data_path": CAMINHO_BASE,
+            "output_path": CAMINHO_BASE_TRADUZIDA,
+            "coluna_alvo": "Obesity",
+        },
+        daemon=True,
+    )
+    tarefa.start()
+    return tarefa
+
+
+@st.cache_resource
+def monitor_ativo() -> dict:
+    # Monitor em uso no processo; ao encerrar, grava o que ficou pendente. Só o
+    # atual: o de um perfil substituído contaria contra a referência antiga.
+    ativo = {"monitor": None}
+
+    def gravar_pendentes():
+        if ativo["monitor"] is not None:
+            ativo["monitor"].salvar_pendentes(CAMINHO_ESTADO_DERIVA)
+
+    atexit.register(gravar_pendentes)
+    return ativo
+
+
+@st.cache_resource(max_entries=1)
+def monitor_deriva(caminho_perfil: Path, versao_perfil: int):
+    # Acumulador único do processo; um novo treino (novo perfil) recomeça a contagem.
+    if not caminho_perfil.exists():
+        return None
+    monitor = MonitorDeriva.carregar_perfil(caminho_perfil)
+    monitor.carregar_estado(CAMINHO_ESTADO_DERIVA)
+    monitor_ativo()["monitor"] = monitor
+    return monitor
+
+
+@st.cache_resource
+def tempos_rerun() -> JanelaTempos:
+    # Últimas durações de rerun (ms), compartilhadas entre as sessões do processo.
+    return JanelaTempos(tamanho=500)
+
+
+sincronizar_base_ptbr()
 
 st.title("Sistema de Predição de Obesidade")
 st.caption(
@@ -84,15 +185,14 @@ st.caption(
 )
 
 # Carrega o modelo treinado ou interrompe com mensagem clara.
+# A versão é lida uma vez por rerun: uma troca no meio da predição não a afeta.
 try:
-    pacote_modelo = ler_modelo()
+    versao_modelo = carregador_modelo().atual()
 except FileNotFoundError as exc:
     st.error(str(exc))
     st.info("Treine o modelo para habilitar as previsões.")
     st.stop()
 
-pipeline_modelo = pacote_modelo["pipeline"]
-
 # Coleta das entradas do usuário no sidebar.
 with st.sidebar:
     st.header("Entradas do paciente")
@@ -182,14 +282,11 @@ linha = {
     "MTRANS": mtrans,
 }
 
-dados_entrada = pd.DataFrame([linha])
-# Calcula IMC para uso no modelo e no resumo do paciente.
-dados_entrada["BMI"] = dados_entrada["Weight"] / (dados_entrada["Height"] ** 2)
-imc = float(dados_entrada["BMI"].iloc[0])
+# Calcula IMC para o resumo do paciente (o modelo recalcula no pré-processamento).
+imc = float(peso) / float(altura) ** 2
 
-# Converte valores para rótulos legíveis na tabela de exibição.
-dados_exibicao = dados_entrada.copy()
-for coluna, mapa in {
+# Converte valores para rótulos legíveis direto no dicionário (uma linha só).
+MAPAS_EXIBICAO = {
     "Gender": MAPA_GENERO,
     "family_history": MAPA_SIM_NAO,
     "FAVC": MAPA_SIM_NAO,
@@ -198,13 +295,15 @@ for coluna, mapa in {
     "SCC": MAPA_SIM_NAO,
     "CALC": MAPA_FREQUENCIA,
     "MTRANS": MAPA_TRANSPORTE,
-}.items():
-    if coluna in dados_exibicao.columns:
-        dados_exibicao[coluna] = dados_exibicao[coluna].map(mapa).fillna(
-            dados_exibicao[coluna]
-        )
-
-dados_exibicao = dados_exibicao.rename(columns=COLUNAS_PT)
+}
+dados_exibicao = pd.DataFrame(
+    [
+        {
+            COLUNAS_PT[coluna]: MAPAS_EXIBICAO.get(coluna, {}).get(valor, valor)
+            for coluna, valor in {**linha, "BMI": imc}.items()
+        }
+    ]
+)
 
 st.markdown("## Resumo do paciente")
 metric_cols = st.columns(4)
@@ -239,7 +338,22 @@ with col_resultado:
     st.subheader("Resultado da predição")
     if botao_prever:
         # Executa a predição apenas quando solicitado.
-        predicao = pipeline_modelo.predict(dados_entrada)[0]
+        modelo = versao_modelo["modelo"]
+        predicao = ler_cache(modelo["caminho_modelo"]).prever(
+            modelo["preditor"], pd.DataFrame([linha])
+        )[0]
+        caminho_perfil = modelo["caminho_perfil"]
+        monitor = monitor_deriva(
+            caminho_perfil,
+            caminho_perfil.stat().st_mtime_ns if caminho_perfil.exists() else 0,
+        )
+        if monitor is not None:
+            monitor.atualizar_registro(linha, predicao)
+            monitor.salvar_pendentes(
+                CAMINHO_ESTADO_DERIVA,
+                minimo=SALVAR_DERIVA_A_CADA,
+                intervalo_s=SALVAR_DERIVA_INTERVALO_S,
+            )
         predicao_pt = MAPA_NIVEL_OBESIDADE.get(predicao, predicao)
         st.success(f"Nível previsto: **{predicao_pt}**")
 
@@ -256,3 +370,23 @@ with col_resultado:
         st.info("Preencha as entradas e clique em **Prever**.")
 
 st.divider()
+
+# Custo do rerun no servidor (não inclui a renderização no navegador).
+# Registrado sempre; exibido só no modo de diagnóstico (?debug=1 na URL).
+duracao_rerun_ms = (time.perf_counter() - INICIO_RERUN) * 1000
+tempos = tempos_rerun()
+tempos.registrar(duracao_rerun_ms)
+if st.query_params.get("debug") == "1":
+    n_tempos, (p50, p95) = tempos.percentis(50, 95)
+    st.caption(
+        f"Rerun em {duracao_rerun_ms:.1f} ms | p50 {p50:.1f} ms"
+        f" | p95 {p95:.1f} ms ({n_tempos} últimos)"
+    )
+metadados = versao_modelo["metadados"]
+acuracia = metadados.get("acuracia")
+st.caption(
+    f"Modelo: versão {metadados['versao']}"
+    + ("" if acuracia is None else f" | acurácia {acuracia:.4f}")
+    + f" | carregado em {metadados['tempo_carga_local_ms']:.0f} ms"
+    f" ({metadados['carregado_em']})"
+)
@@ -0,0 +1,143 @@
+"""Codificação das entradas: one-hot + MinMax x ordinal + float32 cru.
+
+    python -m benchmarks.bench_encoding --repeticoes 30
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from joblib import dump
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from src.obesity_tc.compact_forest import FlorestaCompacta
+from src.obesity_tc.instrumentation import ativar
+from src.obesity_tc.make_dataset import carregar_base_processada
+from src.obesity_tc.profiling import revisao_git
+from src.obesity_tc.stage_cache import ajustar_pipeline
+from src.obesity_tc.train import CODIFICACOES, build_pipeline, separar_entradas
+
+
+def _p50_ms(funcao, repeticoes: int) -> float:
+    funcao()  # aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos) * 1000)
+
+
+def _executar_caso(codificacao: str, config: dict) -> dict:
+    # Processo novo por codificação: o pico de RSS fica isolado.
+    df_limpo = carregar_base_processada(config["data"])
+    entradas, alvo, colunas_numericas, colunas_categoricas = separar_entradas(df_limpo)
+    entradas_treino, entradas_teste, alvo_treino, alvo_teste = train_test_split(
+        entradas, alvo, test_size=0.2, random_state=42, stratify=alvo
+    )
+    pipe = build_pipeline(
+        colunas_numericas, colunas_categoricas, codificacao=codificacao
+    )
+    pipe.named_steps["model"].n_jobs = 1
+
+    # Matrizes que entram no SMOTE e nas árvores.
+    preprocessador = clone(pipe.named_steps["preprocess"])
+    matriz = preprocessador.fit_transform(entradas_treino)
+    matriz_balanceada, _ = clone(pipe.named_steps["smote"]).fit_resample(
+        matriz, alvo_treino
+    )
+
+    tempos_fit = []
+    for _ in range(config["repeticoes_fit"]):
+        medidor = ativar(memoria=False)
+        inicio = time.perf_counter()
+        ajustar_pipeline(pipe, entradas_treino, alvo_treino)
+        tempos_fit.append(time.perf_counter() - inicio)
+    etapas = {
+        nome: r["wall_s"] / r["chamadas"] for nome, r in medidor.resumo().items()
+    }
+
+    floresta = FlorestaCompacta.do_pipeline(pipe)
+    linha = entradas_teste.head(1)
+    with tempfile.TemporaryDirectory() as pasta_temp:
+        caminho_bundle = Path(pasta_temp) / "modelo.joblib"
+        dump({"pipeline": pipe}, caminho_bundle)
+        bundle_mb = caminho_bundle.stat().st_size / 2**20
+    repeticoes = config["repeticoes"]
+    arvores = pipe.named_steps["model"].estimators_
+    return {
+        "codificacao": codificacao,
+        "largura": int(matriz.shape[1]),
+        "dtype": str(matriz.dtype),
+        "matriz_treino_mb": matriz.nbytes / 2**20,
+        "matriz_smote_mb": matriz_balanceada.nbytes / 2**20,
+        "fit_s": float(np.median(tempos_fit)),
+        "preprocess_fit_s": etapas["preprocess.fit_transform"],
+        "smote_s": etapas["smote.fit_resample"],
+        "model_fit_s": etapas["model.fit"],
+        "predict_1_linha_ms": _p50_ms(lambda: pipe.predict(linha), repeticoes),
+        "predict_teste_ms": _p50_ms(lambda: pipe.predict(entradas_teste), repeticoes),
+        "compacta_1_linha_ms": _p50_ms(lambda: floresta.predict(linha), repeticoes),
+        "n_nos": int(sum(a.tree_.node_count for a in arvores)),
+        "bundle_mb": bundle_mb,
+        "rss_pico_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "acuracia": float(accuracy_score(alvo_teste, pipe.predict(entradas_teste))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="data/raw/Obesity.csv")
+    parser.add_argument(
+        "--codificacoes", nargs="+", default=CODIFICACOES, choices=CODIFICACOES
+    )
+    parser.add_argument("--repeticoes", type=int, default=30)
+    parser.add_argument("--repeticoes_fit", type=int, default=1)
+    parser.add_argument("--output", default=None, help="JSON de saída")
+    args = parser.parse_args()
+
+    config = {
+        "data": args.data,
+        "repeticoes": args.repeticoes,
+        "repeticoes_fit": args.repeticoes_fit,
+    }
+    resultados = []
+    contexto = multiprocessing.get_context("spawn")
+    for codificacao in args.codificacoes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            r = pool.submit(_executar_caso, codificacao, config).result()
+        resultados.append(r)
+        print(
+            f"{codificacao:<7} {r['largura']:>3} colunas {r['dtype']:<7}"
+            f" | SMOTE {r['matriz_smote_mb']:.2f} MB | fit {r['fit_s']:.2f}s"
+            f" | 1 linha {r['predict_1_linha_ms']:.1f} ms"
+            f" (compacta {r['compacta_1_linha_ms']:.2f} ms)"
+            f" | {r['n_nos']:,} nós | bundle {r['bundle_mb']:.1f} MB"
+            f" | pico RSS {r['rss_pico_mb']:.0f} MB | acurácia {r['acuracia']:.4f}"
+        )
+
+    revisao = revisao_git()
+    saida = {
+        "revisao": revisao,
+        "data_execucao": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "resultados": resultados,
+    }
+    output_path = Path(args.output or f"reports/benchmarks/codificacao_{revisao}.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(
+        json.dumps(saida, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"OK: resultados em {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Benchmark dos caminhos críticos (rodar de obesity_tc_project/).
+
+    python -m benchmarks.bench_hot_paths --compare reports/benchmarks/<rev>.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import dump, load
+
+from src.obesity_tc.make_dataset import (
+    preprocessar_base,
+    salvar_base_ptbr,
+    traduzir_ptbr,
+)
+from src.obesity_tc.profiling import revisao_git
+from src.obesity_tc.registry import ARQUIVO_MODELO, caminho_atual
+from src.obesity_tc.train import build_pipeline, separar_entradas
+
+OPERACOES = ["preprocessar_base", "traduzir_ptbr", "salvar_base_ptbr", "fit", "predict"]
+TAMANHOS_PADRAO = [1, 100, 10_000, 1_000_000]
+# Abaixo disso o p99 é só o máximo com outro nome; reporta-se o máximo.
+MIN_REPETICOES_P99 = 100
+
+
+def _rss_atual_mb() -> float:
+    # RSS corrente (Linux); fora do Linux cai para o pico do processo.
+    try:
+        paginas = int(Path("/proc/self/statm").read_text().split()[1])
+        return paginas * resource.getpagesize() / 2**20
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _zerar_pico_rss() -> bool:
+    # Linux: "5" em clear_refs zera o VmHWM, para o pico não contar o setup.
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def _pico_rss_mb() -> float:
+    # VmHWM (pico desde o último zeramento); fora do Linux, pico do processo.
+    try:
+        for linha in Path("/proc/self/status").read_text().splitlines():
+            if linha.startswith("VmHWM:"):
+                return int(linha.split()[1]) / 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def ampliar_base(data_path: Path, n_linhas: int, seed: int = 42) -> pd.DataFrame:
+    # Amostra (com reposição quando necessário) linhas reais até o tamanho pedido.
+    df = pd.read_csv(data_path)
+    return df.sample(n=n_linhas, replace=n_linhas > len(df), random_state=seed)
+
+
+def _executar_caso(operacao: str, tamanho: int, config: dict) -> dict:
+    # Roda em um processo novo para que o pico de RSS seja só deste caso.
+    with tempfile.TemporaryDirectory() as pasta_temp:
+        return _medir_caso(operacao, tamanho, config, Path(pasta_temp))
+
+
+def _medir_caso(operacao: str, tamanho: int, config: dict, pasta_temp: Path) -> dict:
+    df_bruto = ampliar_base(config["data"], tamanho).reset_index(drop=True)
+    df_limpo = preprocessar_base(df_bruto)
+    entradas, alvo, colunas_numericas, colunas_categoricas = separar_entradas(df_limpo)
+
+    if operacao == "preprocessar_base":
+
+        def funcao():
+            return preprocessar_base(df_bruto)
+
+    elif operacao == "traduzir_ptbr":
+
+        def funcao():
+            return traduzir_ptbr(df_limpo)
+
+    elif operacao == "salvar_base_ptbr":
+        destino = pasta_temp / "base_ptbr.csv"
+
+        def funcao():
+            return salvar_base_ptbr(df_limpo, destino)
+
+    elif operacao == "fit":
+
+        def funcao():
+            pipeline = build_pipeline(colunas_numericas, colunas_categoricas)
+            return pipeline.fit(entradas, alvo)
+
+    elif operacao == "predict":
+        pipeline = load(config["model"])["pipeline"]
+
+        def funcao():
+            return pipeline.predict(entradas)
+
+    else:
+        raise ValueError(f"Operação desconhecida: {operacao}")
+
+    # Base e modelo já estão carregados: o pico passa a medir só a operação.
+    rss_inicial = _rss_atual_mb()
+    pico_zerado = _zerar_pico_rss()
+    if operacao == "fit":
+        repeticoes = config["repeticoes_fit"]
+    else:
+        repeticoes = (
+            config["repeticoes"] if tamanho <= 10_000 else config["repeticoes_grandes"]
+        )
+    tempos = []
+    try:
+        funcao()  # aquecimento (imports tardios, caches do pandas/sklearn)
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+    except ValueError as exc:
+        # Ex.: SMOTE sem vizinhos suficientes em bases muito pequenas.
+        return {"operacao": operacao, "linhas": tamanho, "erro": str(exc)}
+
+    p50 = float(np.percentile(tempos, 50))
+    resultado = {
+        "operacao": operacao,
+        "linhas": tamanho,
+        "repeticoes": repeticoes,
+        "p50_ms": p50 * 1000,
+        "max_ms": max(tempos) * 1000,
+        "linhas_por_s": tamanho / p50 if p50 > 0 else None,
+        "rss_inicial_mb": rss_inicial,
+        "rss_pico_mb": _pico_rss_mb(),
+        # False: o pico inclui o setup (plataforma sem clear_refs).
+        "rss_pico_sem_setup": pico_zerado,
+    }
+    if repeticoes >= MIN_REPETICOES_P99:
+        resultado["p99_ms"] = float(np.percentile(tempos, 99)) * 1000
+    return resultado
+
+
+def comparar(atual: dict, anterior: dict) -> None:
+    # Razão p50 atual/anterior por caso (>1 significa mais lento).
+    base = {
+        (r["operacao"], r["linhas"]): r
+        for r in anterior["resultados"]
+        if "p50_ms" in r
+    }
+    print(f"\nComparação com {anterior.get('revisao')}:")
+    for r in atual["resultados"]:
+        antigo = base.get((r["operacao"], r["linhas"]))
+        if antigo and "p50_ms" in r:
+            razao = r["p50_ms"] / antigo["p50_ms"]
+            print(f"  {r['operacao']:<18} {r['linhas']:>9} linhas: {razao:.2f}x")
+
+
+def _executar_casos(args, pasta_temp: Path) -> list:
+    # Sem bundle, treina um temporário (apagado com pasta_temp ao final).
+    model_path = Path(args.model or caminho_atual(ARQUIVO_MODELO))
+    if "predict" in args.operations and not model_path.exists():
+        df_limpo = preprocessar_base(pd.read_csv(args.data))
+        entradas, alvo, colunas_numericas, colunas_categoricas = separar_entradas(
+            df_limpo
+        )
+        pipeline = build_pipeline(colunas_numericas, colunas_categoricas)
+        model_path = pasta_temp / "modelo_benchmark.joblib"
+        dump({"pipeline": pipeline.fit(entradas, alvo)}, model_path)
+
+    config = {
+        "data": args.data,
+        "model": str(model_path),
+        "repeticoes": args.repeticoes,
+        "repeticoes_fit": args.repeticoes_fit,
+        "repeticoes_grandes": args.repeticoes_grandes,
+    }
+    casos = [
+        (operacao, tamanho)
+        for operacao in args.operations
+        for tamanho in args.sizes
+        if not (operacao == "fit" and tamanho > args.fit_max_rows)
+    ]
+
+    resultados = []
+    contexto = multiprocessing.get_context("spawn")
+    for operacao, tamanho in casos:
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            resultado = pool.submit(_executar_caso, operacao, tamanho, config).result()
+        resultados.append(resultado)
+        if "erro" in resultado:
+            print(f"{operacao:<18} {tamanho:>9} linhas: erro ({resultado['erro']})")
+        else:
+            p99 = resultado.get("p99_ms")
+            print(
+                f"{operacao:<18} {tamanho:>9} linhas: p50 {resultado['p50_ms']:.2f} ms"
+                f" | max {resultado['max_ms']:.2f} ms"
+                + ("" if p99 is None else f" | p99 {p99:.2f} ms")
+                + f" | {resultado['linhas_por_s']:,.0f} linhas/s"
+                f" | pico RSS {resultado['rss_pico_mb']:.0f} MB (+"
+                f"{resultado['rss_pico_mb'] - resultado['rss_inicial_mb']:.0f} MB "
+                f"sobre o setup)"
+            )
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="data/raw/Obesity.csv")
+    parser.add_argument(
+        "--model",
+        default=None,
+        help="Bundle do predict (padrão: versão ativa; treinado se não existir).",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--operations", nargs="+", default=OPERACOES, choices=OPERACOES)
+    parser.add_argument(
+        "--repeticoes",
+        type=int,
+        default=MIN_REPETICOES_P99,
+        help=f"Repetições por caso; o p99 só sai com {MIN_REPETICOES_P99} ou mais.",
+    )
+    parser.add_argument(
+        "--repeticoes_grandes",
+        type=int,
+        default=3,
+        help="Repetições nas bases acima de 10.000 linhas (reporta p50 e máximo).",
+    )
+    parser.add_argument("--repeticoes_fit", type=int, default=1)
+    parser.add_argument(
+        "--fit_max_rows",
+        type=int,
+        default=10_000,
+        help="Maior base usada no benchmark de fit (o treino de 1M linhas leva horas).",
+    )
+    parser.add_argument("--output", default=None, help="JSON de saída")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta_temp:
+        resultados = _executar_casos(args, Path(pasta_temp))
+
+    revisao = revisao_git()
+    saida = {
+        "revisao": revisao,
+        "data_execucao": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "scikit-learn": sklearn.__version__,
+            "processador": platform.processor() or platform.machine(),
+        },
+        "resultados": resultados,
+    }
+    output_path = Path(args.output or f"reports/benchmarks/{revisao}.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(
+        json.dumps(saida, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"OK: resultados em {output_path}")
+
+    if args.compare:
+        comparar(saida, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
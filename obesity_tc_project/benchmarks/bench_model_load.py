@@ -0,0 +1,165 @@
+"""Tempo de carga e memória do modelo: bundle joblib x .npz x .npy mapeado.
+
+    python -m benchmarks.bench_model_load --processos 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+from joblib import load
+
+from src.obesity_tc.compact_forest import (
+    FlorestaCompacta,
+    salvar_floresta,
+    salvar_floresta_mmap,
+)
+from src.obesity_tc.make_dataset import preprocessar_base
+from src.obesity_tc.profiling import revisao_git
+from src.obesity_tc.registry import ARQUIVO_MODELO, caminho_atual
+
+FORMATOS = ["joblib", "npz", "mmap"]
+
+
+def _memoria_mb() -> dict:
+    # RSS privado (anônimo), RSS de arquivos mapeados e PSS (páginas
+    # compartilhadas divididas entre os processos que as usam). Só Linux.
+    memoria = {}
+    for arquivo, campos in [
+        ("/proc/self/status", ("RssAnon", "RssFile")),
+        ("/proc/self/smaps_rollup", ("Rss", "Pss")),
+    ]:
+        try:
+            linhas = Path(arquivo).read_text().splitlines()
+        except OSError:
+            continue
+        for linha in linhas:
+            nome, _, valor = linha.partition(":")
+            if nome in campos:
+                memoria[nome.lower()] = int(valor.split()[0]) / 1024
+    return memoria
+
+
+def _carregar(formato: str, caminhos: dict):
+    if formato == "joblib":
+        return load(caminhos["joblib"])["pipeline"]
+    if formato == "npz":
+        return FlorestaCompacta.carregar(caminhos["npz"])
+    return FlorestaCompacta.mapear(caminhos["mmap"])
+
+
+def _executar(formato: str, caminhos: dict, amostra, barreira, fila) -> None:
+    # Processo novo por medida: imports já feitos, modelo ainda não carregado.
+    antes = _memoria_mb()
+    inicio = time.perf_counter()
+    modelo = _carregar(formato, caminhos)
+    carga_ms = (time.perf_counter() - inicio) * 1000
+    inicio = time.perf_counter()
+    modelo.predict(amostra)
+    predicao_ms = (time.perf_counter() - inicio) * 1000
+    # Todos os processos vivos ao mesmo tempo para o PSS refletir o compartilhamento.
+    barreira.wait()
+    depois = _memoria_mb()
+    barreira.wait()
+    fila.put(
+        {
+            "formato": formato,
+            "carga_ms": carga_ms,
+            "primeira_predicao_ms": predicao_ms,
+            **{f"{k}_mb": depois[k] - antes.get(k, 0.0) for k in depois},
+        }
+    )
+
+
+def medir(formato: str, caminhos: dict, amostra, n_processos: int) -> list:
+    contexto = multiprocessing.get_context("spawn")
+    barreira = contexto.Barrier(n_processos)
+    fila = contexto.Queue()
+    processos = [
+        contexto.Process(
+            target=_executar, args=(formato, caminhos, amostra, barreira, fila)
+        )
+        for _ in range(n_processos)
+    ]
+    for processo in processos:
+        processo.start()
+    resultados = [fila.get() for _ in processos]
+    for processo in processos:
+        processo.join()
+    return resultados
+
+
+def _medir_formatos(args, pasta: Path) -> list:
+    # Exporta os formatos compactos do mesmo bundle em pasta (apagada pelo chamador).
+    pipeline = load(args.model)["pipeline"]
+    caminhos = {
+        "joblib": args.model,
+        "npz": str(salvar_floresta(pipeline, pasta / "floresta.npz")),
+        "mmap": str(salvar_floresta_mmap(pipeline, pasta / "floresta_mmap")),
+    }
+    del pipeline
+    amostra = preprocessar_base(pd.read_csv(args.data)).head(1)
+
+    resultados = []
+    for formato in args.formatos:
+        medidas = medir(formato, caminhos, amostra, args.processos)
+        resumo = {
+            "formato": formato,
+            "processos": args.processos,
+            **{
+                chave: sum(m[chave] for m in medidas) / len(medidas)
+                for chave in medidas[0]
+                if chave != "formato"
+            },
+        }
+        resultados.append(resumo)
+        print(
+            f"{formato:<7} carga {resumo['carga_ms']:8.1f} ms"
+            f" | 1ª predição {resumo['primeira_predicao_ms']:7.1f} ms"
+            f" | RSS anônimo +{resumo.get('rssanon_mb', float('nan')):6.1f} MB"
+            f" | PSS +{resumo.get('pss_mb', float('nan')):6.1f} MB por processo"
+        )
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--model", default=None, help="Bundle (padrão: versão ativa em models/)."
+    )
+    parser.add_argument("--data", default="data/raw/Obesity.csv")
+    parser.add_argument(
+        "--processos",
+        type=int,
+        default=2,
+        help="Processos simultâneos com o modelo carregado (réplicas do app).",
+    )
+    parser.add_argument("--formatos", nargs="+", default=FORMATOS, choices=FORMATOS)
+    parser.add_argument("--output", default=None, help="JSON de saída")
+    args = parser.parse_args()
+    args.model = str(args.model or caminho_atual(ARQUIVO_MODELO))
+
+    with tempfile.TemporaryDirectory() as pasta_temp:
+        resultados = _medir_formatos(args, Path(pasta_temp))
+
+    revisao = revisao_git()
+    saida = {
+        "revisao": revisao,
+        "data_execucao": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "resultados": resultados,
+    }
+    output_path = Path(args.output or f"reports/benchmarks/carga_modelo_{revisao}.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(
+        json.dumps(saida, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"OK: resultados em {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,18 @@ import plotly.express as px
 import streamlit as st
 from pathlib import Path
 
-from src.obesity_tc.make_dataset import preprocessar_base, salvar_base_ptbr
+from src.obesity_tc.aggregates import (
+    CuboContagens,
+    GradeDispersao,
+    Histogramas,
+    MomentosSegmento,
+)
+from src.obesity_tc.make_dataset import (
+    atualizar_base_ptbr,
+    carregar_base_processada,
+    chave_base_processada,
+    traduzir_coluna,
+)
 
 MAPA_NIVEL_OBESIDADE = {
     "Insufficient_Weight": "Peso insuficiente",
@@ -62,82 +73,105 @@ ROTULOS_CATEGORICOS = {
 }
 ROTULOS_GRAFICOS = {**ROTULOS_NUMERICOS, **ROTULOS_CATEGORICOS}
 ROTULOS_EIXOS = {**ROTULOS_GRAFICOS, "count": "Quantidade"}
+# Coluna original e tradução de cada variável categórica exibida.
+ORIGEM_CATEGORICAS = {
+    "Genero_PT": ("Gender", MAPA_GENERO),
+    "FAVC_PT": ("FAVC", MAPA_SIM_NAO),
+    "CAEC_PT": ("CAEC", MAPA_FREQUENCIA),
+    "CALC_PT": ("CALC", MAPA_FREQUENCIA),
+    "SCC_PT": ("SCC", MAPA_SIM_NAO),
+    "Historico_PT": ("family_history", MAPA_SIM_NAO),
+    "Transporte_PT": ("MTRANS", MAPA_TRANSPORTE),
+    "SMOKE_PT": ("SMOKE", MAPA_SIM_NAO),
+}
+# Acima deste total filtrado, histogramas e dispersão usam contagens agregadas.
+LIMITE_PONTOS_BRUTOS = 5_000
+RESOLUCAO_GRADE = 60
+NIVEL_POR_ROTULO = {v: k for k, v in MAPA_NIVEL_OBESIDADE.items()}
+GENERO_POR_ROTULO = {v: k for k, v in MAPA_GENERO.items()}
 
 
-@st.cache_data
-def ler_base() -> pd.DataFrame:
-    # Carrega a base bruta e aplica o pré-processamento padrão.
+def versao_dados() -> str:
+    # Chave de conteúdo da base (hash memoizado por mtime/tamanho no manifesto).
     if not DATA_PATH.exists():
         raise FileNotFoundError("Base de dados não encontrada em data/raw/Obesity.csv.")
-    df_raw = pd.read_csv(DATA_PATH)
-    return preprocessar_base(df_raw, coluna_alvo="Obesity")
+    return chave_base_processada(DATA_PATH, coluna_alvo="Obesity")
+
+
+@st.cache_resource(max_entries=2)
+def ler_base(versao: str) -> pd.DataFrame:
+    # Carrega a base pré-processada (cache em Parquet chaveado pelo conteúdo).
+    # Compartilhada entre sessões: não deve ser alterada depois de montada.
+    df = carregar_base_processada(DATA_PATH, coluna_alvo="Obesity")
+    if "BMI" not in df.columns and "Height" in df.columns and "Weight" in df.columns:
+        df["BMI"] = df["Weight"] / (df["Height"] ** 2)
+    df["Nivel_Obesidade_PT"] = traduzir_coluna(
+        df["Obesity_level"], MAPA_NIVEL_OBESIDADE
+    )
+    return df
 
 
-st.title("Dashboard Analítico")
-st.caption("Análises exploratórias da base de pacientes.")
+@st.cache_resource(max_entries=2)
+def ler_cubo(versao: str) -> CuboContagens:
+    # Contagens nível × gênero × categoria, montadas uma vez por versão da base.
+    return CuboContagens.construir(ler_base(versao))
 
-# Carrega dados e mantém a versão traduzida sincronizada.
-try:
-    df = ler_base()
-except FileNotFoundError as exc:
-    st.error(str(exc))
-    st.stop()
-else:
-    if (
-        not CAMINHO_BASE_TRADUZIDA.exists()
-        or CAMINHO_BASE_TRADUZIDA.stat().st_mtime < DATA_PATH.stat().st_mtime
-    ):
-        salvar_base_ptbr(df, CAMINHO_BASE_TRADUZIDA)
-
-# Garante o IMC disponível para análises numéricas.
-if "BMI" not in df.columns and "Height" in df.columns and "Weight" in df.columns:
-    df["BMI"] = df["Weight"] / (df["Height"] ** 2)
-
-# Cria colunas traduzidas para filtros e visualizações.
-df["Nivel_Obesidade_PT"] = df["Obesity_level"].map(MAPA_NIVEL_OBESIDADE).fillna(
-    df["Obesity_level"]
-)
-df["Genero_PT"] = df["Gender"].map(MAPA_GENERO).fillna(df["Gender"])
 
-if "MTRANS" in df.columns:
-    df["Transporte_PT"] = df["MTRANS"].map(MAPA_TRANSPORTE).fillna(df["MTRANS"])
+@st.cache_resource(max_entries=2)
+def ler_histogramas(versao: str) -> Histogramas:
+    df = ler_base(versao)
+    return Histogramas.construir(df, [c for c in ROTULOS_NUMERICOS if c in df.columns])
 
-if "FAVC" in df.columns:
-    df["FAVC_PT"] = df["FAVC"].map(MAPA_SIM_NAO).fillna(df["FAVC"])
 
-if "CAEC" in df.columns:
-    df["CAEC_PT"] = df["CAEC"].map(MAPA_FREQUENCIA).fillna(df["CAEC"])
+@st.cache_resource(max_entries=2)
+def ler_grade(versao: str) -> GradeDispersao:
+    return GradeDispersao.construir(
+        ler_base(versao), "Height", "Weight", resolucao=RESOLUCAO_GRADE
+    )
 
-if "CALC" in df.columns:
-    df["CALC_PT"] = df["CALC"].map(MAPA_FREQUENCIA).fillna(df["CALC"])
 
-if "SCC" in df.columns:
-    df["SCC_PT"] = df["SCC"].map(MAPA_SIM_NAO).fillna(df["SCC"])
+@st.cache_resource(max_entries=2)
+def ler_momentos(versao: str) -> MomentosSegmento:
+    return MomentosSegmento.construir(ler_base(versao), list(ROTULOS_NUMERICOS))
 
-if "SMOKE" in df.columns:
-    df["SMOKE_PT"] = df["SMOKE"].map(MAPA_SIM_NAO).fillna(df["SMOKE"])
 
-if "family_history" in df.columns:
-    df["Historico_PT"] = df["family_history"].map(MAPA_SIM_NAO).fillna(
-        df["family_history"]
-    )
+def tabela_categoria(coluna_pt: str, niveis, generos) -> pd.DataFrame:
+    # Contagens (categoria, nível) traduzidas, no formato do antigo groupby.
+    coluna, mapa = ORIGEM_CATEGORICAS[coluna_pt]
+    tabela = cubo.por_categoria(coluna, niveis, generos)
+    tabela = tabela.rename(index=mapa, columns=MAPA_NIVEL_OBESIDADE)
+    longa = tabela.rename_axis(index=coluna_pt, columns="Nivel_Obesidade_PT")
+    longa = longa.stack().reset_index(name="Quantidade")
+    return longa[longa["Quantidade"] > 0]
+
+
+st.title("Dashboard Analítico")
+st.caption("Análises exploratórias da base de pacientes.")
+
+# Carrega dados e mantém a versão traduzida sincronizada.
+try:
+    versao = versao_dados()
+except FileNotFoundError as exc:
+    st.error(str(exc))
+    st.stop()
+df = ler_base(versao)
+cubo = ler_cubo(versao)
+atualizar_base_ptbr(DATA_PATH, CAMINHO_BASE_TRADUZIDA, coluna_alvo="Obesity")
 
 st.subheader("Filtros")
 filtro_col1, filtro_col2 = st.columns(2)
 
 with filtro_col1:
-    niveis_disponiveis = ORDEM_NIVEIS if "Nivel_Obesidade_PT" in df.columns else []
     niveis_selecionados = st.multiselect(
         "Nível de obesidade",
-        options=niveis_disponiveis,
-        default=niveis_disponiveis,
+        options=ORDEM_NIVEIS,
+        default=ORDEM_NIVEIS,
     )
 
 with filtro_col2:
-    generos_disponiveis = (
-        sorted(df["Genero_PT"].dropna().unique().tolist())
-        if "Genero_PT" in df.columns
-        else []
+    contagem_generos = cubo.por_genero()
+    generos_disponiveis = sorted(
+        MAPA_GENERO[g] for g in contagem_generos[contagem_generos > 0].index
     )
     generos_selecionados = st.multiselect(
         "Gênero",
@@ -145,31 +179,43 @@ with filtro_col2:
         default=generos_disponiveis,
     )
 
-# Aplica filtros para reduzir o conjunto exibido.
-df_vis = df.copy()
-if niveis_selecionados:
-    df_vis = df_vis[df_vis["Nivel_Obesidade_PT"].isin(niveis_selecionados)]
-if generos_selecionados:
-    df_vis = df_vis[df_vis["Genero_PT"].isin(generos_selecionados)]
-if df_vis.empty:
+# Filtros respondidos pelo cubo (sem varrer as linhas da base).
+niveis = [NIVEL_POR_ROTULO[n] for n in niveis_selecionados]
+generos = [GENERO_POR_ROTULO[g] for g in generos_selecionados]
+total_base = cubo.total()
+total_filtrado = cubo.total(niveis, generos)
+if total_filtrado == 0:
     st.warning("Nenhum registro com os filtros selecionados. Exibindo base completa.")
-    df_vis = df
-
-st.caption(f"Exibindo {len(df_vis)} de {len(df)} registros.")
-
+    niveis, generos = [], []
+    total_filtrado = total_base
+
+# Linhas filtradas só para os gráficos de pontos brutos (seleções pequenas).
+df_vis = None
+if total_filtrado <= LIMITE_PONTOS_BRUTOS:
+    mascara = pd.Series(True, index=df.index)
+    if niveis:
+        mascara &= df["Obesity_level"].isin(niveis)
+    if generos:
+        mascara &= df["Gender"].isin(generos)
+    df_vis = df[mascara]
+
+st.caption(f"Exibindo {total_filtrado} de {total_base} registros.")
+
+momentos = ler_momentos(versao)
+medias = momentos.medias(niveis, generos)
 metric_cols = st.columns(4)
-metric_cols[0].metric("Registros", len(df_vis))
+metric_cols[0].metric("Registros", total_filtrado)
 metric_cols[1].metric(
     "Idade média",
-    f"{df_vis['Age'].mean():.1f}" if "Age" in df_vis.columns else "-",
+    f"{medias['Age']:.1f}" if "Age" in medias.index else "-",
 )
 metric_cols[2].metric(
     "IMC médio",
-    f"{df_vis['BMI'].mean():.1f}" if "BMI" in df_vis.columns else "-",
+    f"{medias['BMI']:.1f}" if "BMI" in medias.index else "-",
 )
 metric_cols[3].metric(
     "Peso médio (kg)",
-    f"{df_vis['Weight'].mean():.1f}" if "Weight" in df_vis.columns else "-",
+    f"{medias['Weight']:.1f}" if "Weight" in medias.index else "-",
 )
 
 # Tabs para organizar o excesso de variáveis na tela.
@@ -181,16 +227,14 @@ with tab_resumo:
     col1, col2 = st.columns(2)
 
     with col1:
-        if "Nivel_Obesidade_PT" in df_vis.columns:
-            distribuicao = (
-                df_vis["Nivel_Obesidade_PT"]
-                .value_counts()
-                .reindex(ORDEM_NIVEIS)
-                .fillna(0)
-                .reset_index()
-            )
-            distribuicao.columns = ["Nível", "Quantidade"]
-            distribuicao = distribuicao[distribuicao["Quantidade"] > 0]
+        distribuicao = (
+            cubo.por_nivel(niveis, generos)
+            .rename(index=MAPA_NIVEL_OBESIDADE)
+            .loc[lambda s: s > 0]
+            .reset_index()
+        )
+        distribuicao.columns = ["Nível", "Quantidade"]
+        if not distribuicao.empty:
             fig_niveis = px.pie(
                 distribuicao,
                 names="Nível",
@@ -204,8 +248,13 @@ with tab_resumo:
             st.info("Coluna de nível de obesidade não disponível.")
 
     with col2:
-        if "Genero_PT" in df_vis.columns:
-            distribuicao_genero = df_vis["Genero_PT"].value_counts().reset_index()
+        distribuicao_genero = (
+            cubo.por_genero(niveis, generos)
+            .rename(index=MAPA_GENERO)
+            .loc[lambda s: s > 0]
+            .reset_index()
+        )
+        if not distribuicao_genero.empty:
             distribuicao_genero.columns = ["Gênero", "Quantidade"]
             fig_genero = px.bar(
                 distribuicao_genero,
@@ -222,7 +271,7 @@ with tab_resumo:
             st.info("Coluna de gênero não disponível.")
 
 with tab_numericas:
-    colunas_numericas = [c for c in ROTULOS_NUMERICOS if c in df_vis.columns]
+    colunas_numericas = [c for c in ROTULOS_NUMERICOS if c in df.columns]
     if not colunas_numericas:
         st.info("Sem variáveis numéricas disponíveis para análise.")
     else:
@@ -237,21 +286,49 @@ with tab_numericas:
             key="comparar_numericas",
         )
 
-        n_bins = 20
-        valores_unicos = df_vis[coluna_escolhida].dropna().unique()
-        if 0 < len(valores_unicos) <= 10:
-            n_bins = len(valores_unicos)
-
-        fig_numerica = px.histogram(
-            df_vis,
-            x=coluna_escolhida,
-            color="Nivel_Obesidade_PT" if comparar_niveis else None,
-            nbins=n_bins,
-            barmode="overlay" if comparar_niveis else "group",
-            opacity=0.7 if comparar_niveis else 1.0,
-            title=f"Distribuição de {ROTULOS_NUMERICOS.get(coluna_escolhida, coluna_escolhida)}",
-            labels=ROTULOS_EIXOS,
+        titulo = (
+            f"Distribuição de {ROTULOS_NUMERICOS.get(coluna_escolhida, coluna_escolhida)}"
         )
+        if total_filtrado <= LIMITE_PONTOS_BRUTOS:
+            n_bins = 20
+            valores_unicos = df_vis[coluna_escolhida].dropna().unique()
+            if 0 < len(valores_unicos) <= 10:
+                n_bins = len(valores_unicos)
+
+            fig_numerica = px.histogram(
+                df_vis,
+                x=coluna_escolhida,
+                color="Nivel_Obesidade_PT" if comparar_niveis else None,
+                nbins=n_bins,
+                barmode="overlay" if comparar_niveis else "group",
+                opacity=0.7 if comparar_niveis else 1.0,
+                title=titulo,
+                labels=ROTULOS_EIXOS,
+            )
+        else:
+            # Faixas pré-contadas no servidor: payload limitado ao número de faixas.
+            histogramas = ler_histogramas(versao)
+            tabela = histogramas.por_nivel(coluna_escolhida, niveis, generos)
+            tabela = tabela.rename(columns=MAPA_NIVEL_OBESIDADE)
+            if comparar_niveis:
+                faixas = tabela.rename_axis(
+                    index=coluna_escolhida, columns="Nivel_Obesidade_PT"
+                ).stack()
+            else:
+                faixas = tabela.sum(axis=1).rename_axis(coluna_escolhida)
+            faixas = faixas.reset_index(name="Quantidade")
+            fig_numerica = px.bar(
+                faixas[faixas["Quantidade"] > 0],
+                x=coluna_escolhida,
+                y="Quantidade",
+                color="Nivel_Obesidade_PT" if comparar_niveis else None,
+                barmode="overlay" if comparar_niveis else "group",
+                opacity=0.7 if comparar_niveis else 1.0,
+                title=titulo,
+                labels=ROTULOS_EIXOS,
+            )
+            fig_numerica.update_traces(width=histogramas.largura(coluna_escolhida))
+            fig_numerica.update_layout(bargap=0)
         if comparar_niveis:
             fig_numerica.update_layout(legend_title_text="Nível de obesidade")
         fig_numerica.update_layout(yaxis_title="Quantidade")
@@ -261,7 +338,7 @@ with tab_categoricas:
     colunas_categoricas = [
         c
         for c in ROTULOS_CATEGORICOS
-        if c in df_vis.columns and c != "Nivel_Obesidade_PT"
+        if c in ORIGEM_CATEGORICAS and ORIGEM_CATEGORICAS[c][0] in cubo.cubos
     ]
     if not colunas_categoricas:
         st.info("Sem variáveis categóricas disponíveis para análise.")
@@ -277,12 +354,8 @@ with tab_categoricas:
             key="comparar_categoricas",
         )
 
-        if comparar_niveis and "Nivel_Obesidade_PT" in df_vis.columns:
-            agrupado = (
-                df_vis.groupby([coluna_escolhida, "Nivel_Obesidade_PT"])
-                .size()
-                .reset_index(name="Quantidade")
-            )
+        agrupado = tabela_categoria(coluna_escolhida, niveis, generos)
+        if comparar_niveis:
             fig_cat = px.bar(
                 agrupado,
                 x=coluna_escolhida,
@@ -297,7 +370,11 @@ with tab_categoricas:
             )
             fig_cat.update_layout(legend_title_text="Nível de obesidade")
         else:
-            distribuicao = df_vis[coluna_escolhida].value_counts().reset_index()
+            distribuicao = (
+                agrupado.groupby(coluna_escolhida, sort=False)["Quantidade"]
+                .sum()
+                .reset_index()
+            )
             distribuicao.columns = ["Categoria", "Quantidade"]
             fig_cat = px.bar(
                 distribuicao,
@@ -321,20 +398,42 @@ with tab_relacoes:
     col1, col2 = st.columns(2)
 
     with col1:
-        if "Height" in df_vis.columns and "Weight" in df_vis.columns:
+        rotulos_dispersao = {
+            "Height": "Altura (m)",
+            "Weight": "Peso (kg)",
+            "Nivel_Obesidade_PT": "Nível de obesidade",
+        }
+        if not ("Height" in df.columns and "Weight" in df.columns):
+            fig_dispersao = None
+        elif total_filtrado <= LIMITE_PONTOS_BRUTOS:
             fig_dispersao = px.scatter(
                 df_vis,
                 x="Height",
                 y="Weight",
-                color="Nivel_Obesidade_PT" if "Nivel_Obesidade_PT" in df_vis.columns else None,
+                color="Nivel_Obesidade_PT",
                 title="Relação entre altura e peso",
-                labels={
-                    "Height": "Altura (m)",
-                    "Weight": "Peso (kg)",
-                    "Nivel_Obesidade_PT": "Nível de obesidade",
-                },
+                labels=rotulos_dispersao,
+                opacity=0.7,
+            )
+        else:
+            # Densidade 2D: um ponto por célula da grade, com tamanho pela contagem.
+            pontos = ler_grade(versao).pontos(niveis, generos)
+            pontos["Nivel_Obesidade_PT"] = pontos["Obesity_level"].map(
+                MAPA_NIVEL_OBESIDADE
+            )
+            fig_dispersao = px.scatter(
+                pontos,
+                x="Height",
+                y="Weight",
+                color="Nivel_Obesidade_PT",
+                size="Quantidade",
+                size_max=14,
+                category_orders={"Nivel_Obesidade_PT": ORDEM_NIVEIS},
+                title="Relação entre altura e peso (densidade agregada)",
+                labels=rotulos_dispersao,
                 opacity=0.7,
             )
+        if fig_dispersao is not None:
             fig_dispersao.update_layout(legend_title_text="Nível de obesidade")
             st.plotly_chart(fig_dispersao, use_container_width=True)
         else:
@@ -344,10 +443,11 @@ with tab_relacoes:
         num_cols = [
             c
             for c in ["Age", "Height", "Weight", "FCVC", "NCP", "CH2O", "FAF", "TUE", "BMI"]
-            if c in df_vis.columns
+            if c in momentos.colunas
         ]
         if len(num_cols) >= 2:
-            corr = df_vis[num_cols].corr(numeric_only=True)
+            # Pearson montado a partir dos momentos por segmento (sem varrer linhas).
+            corr = momentos.correlacao(niveis, generos).loc[num_cols, num_cols]
             corr = corr.rename(columns=ROTULOS_NUMERICOS, index=ROTULOS_NUMERICOS)
             fig_corr = px.imshow(
                 corr,
@@ -2,12 +2,30 @@ import json
 from pathlib import Path
 
 import pandas as pd
+import plotly.express as px
 import streamlit as st
 
+from src.obesity_tc.drift import MonitorDeriva
+from src.obesity_tc.registry import (
+    ARQUIVO_PERFIL,
+    caminho_atual,
+    ler_ponteiro,
+    listar_versoes,
+)
+
 # Caminhos base para relatórios gerados no treino.
 BASE_DIR = Path(__file__).resolve().parents[1]
 METRICS_PATH = BASE_DIR / "reports/metrics.json"
 REPORT_PATH = BASE_DIR / "reports/classification_report.txt"
+MODELS_DIR = BASE_DIR / "models"
+# Perfil da versão ativa do modelo (ou de models/, no layout sem versões).
+PERFIL_DERIVA_PATH = caminho_atual(ARQUIVO_PERFIL, MODELS_DIR)
+# Contagens acumuladas por origem das predições.
+ESTADOS_DERIVA = {
+    "App (Predicao)": BASE_DIR / "models/deriva_app.json",
+    "Lote (predict.py)": BASE_DIR / "models/deriva_lote.json",
+    "API (serve.py)": BASE_DIR / "models/deriva_api.json",
+}
 
 
 def ler_metricas() -> dict:
@@ -52,7 +70,8 @@ O resultado serve como apoio à triagem e não substitui a avaliação clínica.
 
 ### Como a previsão é gerada
 - **Pré-processamento:** MinMaxScaler para variáveis numéricas e OneHotEncoder para
-  variáveis categóricas.
+  variáveis categóricas; com `train.py --encoding ordinal`, numéricas cruas em float32 e
+  um código inteiro por categoria (as árvores não dependem de escala).
 - **Balanceamento:** SMOTE aplicado somente no conjunto de treino.
 - **Modelo:** Random Forest multiclasse.
 
@@ -91,6 +110,104 @@ if metricas:
             st.dataframe(pd.DataFrame(matriz, index=classes, columns=classes))
         else:
             st.dataframe(pd.DataFrame(matriz))
+
+    validacao = metricas.get("validacao_cruzada")
+    if validacao:
+        # Gerada com train.py --cv K.
+        st.subheader(f"Validação cruzada estratificada ({validacao['n_folds']} folds)")
+        col1, col2, col3 = st.columns(3)
+        col1.metric(
+            "Acurácia média",
+            f"{validacao['acuracia_media']:.4f}",
+            f"± {validacao['acuracia_desvio']:.4f}",
+            delta_color="off",
+        )
+        col2.metric("F1 macro médio", f"{validacao['f1_macro_medio']:.4f}")
+        col3.metric(
+            "Tempo total",
+            f"{validacao['tempo_total_s']:.1f} s",
+            f"{validacao['aceleracao']:.1f}x com {validacao['workers']} processo(s)",
+            delta_color="off",
+        )
+        st.dataframe(
+            pd.DataFrame(validacao["folds"])[
+                ["fold", "n_treino", "n_teste", "acuracia", "f1_macro", "tempo_s"]
+            ],
+            hide_index=True,
+        )
+
+    etapas = metricas.get("etapas")
+    if etapas:
+        # Gerado com train.py --instrument (padrão).
+        st.subheader("Tempo e memória por etapa")
+        df_etapas = pd.DataFrame(
+            [{"etapa": nome, **valores} for nome, valores in etapas.items()]
+        ).rename(
+            columns={
+                "etapa": "Etapa",
+                "chamadas": "Chamadas",
+                "wall_s": "Relógio (s)",
+                "cpu_s": "CPU (s)",
+                "pico_mb": "Pico de memória (MB)",
+            }
+        )
+        st.dataframe(df_etapas.round(3), hide_index=True)
+
+    curva = metricas.get("curva_tamanho_floresta")
+    if curva:
+        # Curva gerada com train.py --max_predict_ms.
+        st.subheader("Acurácia x latência por tamanho da floresta")
+        df_curva = pd.DataFrame(curva)
+        df_curva["Profundidade"] = [
+            "sem limite" if pd.isna(p) else str(int(p)) for p in df_curva["max_depth"]
+        ]
+        fig_curva = px.line(
+            df_curva,
+            x="latencia_predict_ms",
+            y="acuracia",
+            color="Profundidade",
+            markers=True,
+            hover_data=["n_estimators", "n_nos"],
+            labels={
+                "latencia_predict_ms": "Latência de predict, 1 linha (ms)",
+                "acuracia": "Acurácia",
+            },
+        )
+        orcamento = metricas.get("orcamento_predict_ms")
+        if orcamento is not None:
+            fig_curva.add_vline(x=orcamento, line_dash="dash")
+        st.plotly_chart(fig_curva, use_container_width=True)
+        escolhido = metricas.get("modelo_escolhido")
+        if escolhido:
+            profundidade = escolhido["max_depth"] or "sem limite"
+            st.caption(
+                f"Modelo escolhido: {escolhido['n_estimators']} árvores, profundidade "
+                f"{profundidade} (acurácia {escolhido['acuracia']:.4f}, "
+                f"{escolhido['latencia_predict_ms']:.1f} ms)."
+            )
+
+    versoes = listar_versoes(MODELS_DIR)
+    if versoes:
+        # Publicadas pelo train.py; rollback com python -m src.obesity_tc.registry.
+        st.subheader("Versões do modelo")
+        ativa = (ler_ponteiro(MODELS_DIR) or {}).get("versao")
+        df_versoes = pd.DataFrame(versoes)
+        df_versoes.insert(0, "ativa", df_versoes["versao"] == ativa)
+        st.dataframe(df_versoes.iloc[::-1], hide_index=True)
+
+    if PERFIL_DERIVA_PATH.exists():
+        # PSI/KL das entradas e das classes previstas contra o perfil do treino.
+        monitores = {}
+        for origem, caminho in ESTADOS_DERIVA.items():
+            monitor = MonitorDeriva.carregar_perfil(PERFIL_DERIVA_PATH)
+            if monitor.carregar_estado(caminho) and monitor.n:
+                monitores[origem] = monitor
+        if monitores:
+            st.subheader("Deriva dos dados em produção")
+            st.caption("PSI < 0,1 estável; 0,1 a 0,25 moderada; acima de 0,25 alta.")
+            for origem, monitor in monitores.items():
+                st.markdown(f"**{origem}** ({monitor.n} predições)")
+                st.dataframe(monitor.comparar().round(4), hide_index=True)
 else:
     # Orienta sobre como gerar as métricas caso não existam.
     st.info(
@@ -0,0 +1,272 @@
+import numpy as np
+import pandas as pd
+
+from src.obesity_tc.make_dataset import CATEGORIAS_FIXAS
+
+NIVEIS = CATEGORIAS_FIXAS["Obesity_level"]
+GENEROS = CATEGORIAS_FIXAS["Gender"]
+COLUNAS_CUBO = [
+    "Gender",
+    "family_history",
+    "FAVC",
+    "CAEC",
+    "SMOKE",
+    "SCC",
+    "CALC",
+    "MTRANS",
+]
+
+
+def _codigos(serie: pd.Series, categorias: list) -> np.ndarray:
+    # Códigos inteiros na ordem fixa do esquema (-1 para ausentes/desconhecidos).
+    return pd.Categorical(serie, categories=categorias).codes.astype(np.int64)
+
+
+def _categorias(serie: pd.Series, fixas: list) -> list:
+    # Esquema fixo seguido das categorias extras que aplicar_esquema mantém.
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        extras = [c for c in serie.cat.categories if c not in fixas]
+    else:
+        extras = sorted(set(serie.dropna().astype(str)) - set(fixas))
+    return list(fixas) + extras
+
+
+def _celulas(df: pd.DataFrame):
+    # Índice da célula nível × gênero de cada linha e máscara de linhas válidas.
+    codigo_nivel = _codigos(df["Obesity_level"], NIVEIS)
+    codigo_genero = _codigos(df["Gender"], GENEROS)
+    validos = (codigo_nivel >= 0) & (codigo_genero >= 0)
+    return codigo_nivel * len(GENEROS) + codigo_genero, validos
+
+
+def _posicoes(selecionados, universo: list) -> np.ndarray:
+    # Sem seleção equivale a "todos", como nos filtros do dashboard.
+    if not selecionados:
+        return np.arange(len(universo))
+    return np.asarray([universo.index(v) for v in selecionados if v in universo])
+
+
+class CuboContagens:
+    """Contagens pré-agregadas por nível de obesidade × gênero × categoria."""
+
+    def __init__(self, base: np.ndarray, cubos: dict, categorias: dict):
+        self.base = base
+        self.cubos = cubos
+        self.categorias = categorias
+
+    @classmethod
+    def construir(cls, df: pd.DataFrame, colunas=COLUNAS_CUBO) -> "CuboContagens":
+        celula, validos = _celulas(df)
+        base = np.bincount(
+            celula[validos], minlength=len(NIVEIS) * len(GENEROS)
+        ).reshape(len(NIVEIS), len(GENEROS))
+
+        cubos, categorias_cubo = {}, {}
+        for coluna in colunas:
+            if coluna not in df.columns:
+                continue
+            # Valores fora do esquema ganham posições próprias em vez de sumir.
+            categorias = _categorias(df[coluna], CATEGORIAS_FIXAS[coluna])
+            categorias_cubo[coluna] = categorias
+            codigo = _codigos(df[coluna], categorias)
+            ok = validos & (codigo >= 0)
+            contagens = np.bincount(
+                celula[ok] * len(categorias) + codigo[ok],
+                minlength=len(NIVEIS) * len(GENEROS) * len(categorias),
+            )
+            cubos[coluna] = contagens.reshape(len(NIVEIS), len(GENEROS), len(categorias))
+        return cls(base, cubos, categorias_cubo)
+
+    def _fatia(self, matriz: np.ndarray, niveis, generos) -> np.ndarray:
+        return matriz[np.ix_(_posicoes(niveis, NIVEIS), _posicoes(generos, GENEROS))]
+
+    def total(self, niveis=None, generos=None) -> int:
+        return int(self._fatia(self.base, niveis, generos).sum())
+
+    def por_nivel(self, niveis=None, generos=None) -> pd.Series:
+        posicoes = _posicoes(niveis, NIVEIS)
+        contagens = self._fatia(self.base, niveis, generos).sum(axis=1)
+        return pd.Series(contagens, index=[NIVEIS[i] for i in posicoes])
+
+    def por_genero(self, niveis=None, generos=None) -> pd.Series:
+        posicoes = _posicoes(generos, GENEROS)
+        contagens = self._fatia(self.base, niveis, generos).sum(axis=0)
+        return pd.Series(contagens, index=[GENEROS[i] for i in posicoes])
+
+    def por_categoria(self, coluna: str, niveis=None, generos=None) -> pd.DataFrame:
+        # Tabela categoria × nível de obesidade para o filtro pedido.
+        cubo = self.cubos[coluna]
+        pos_niveis = _posicoes(niveis, NIVEIS)
+        fatia = cubo[np.ix_(pos_niveis, _posicoes(generos, GENEROS))].sum(axis=1)
+        return pd.DataFrame(
+            fatia.T,
+            index=self.categorias[coluna],
+            columns=[NIVEIS[i] for i in pos_niveis],
+        )
+
+
+def _bordas(valores: np.ndarray, n_bins: int) -> np.ndarray:
+    # Escores discretos (até 10 valores) ganham uma barra por valor.
+    unicos = np.unique(valores)
+    if 0 < len(unicos) <= 10:
+        meios = (unicos[1:] + unicos[:-1]) / 2
+        passo = np.diff(unicos).min() / 2 if len(unicos) > 1 else 0.5
+        return np.concatenate([[unicos[0] - passo], meios, [unicos[-1] + passo]])
+    return np.histogram_bin_edges(valores, bins=n_bins)
+
+
+def _indices_bins(valores: np.ndarray, bordas: np.ndarray) -> np.ndarray:
+    indices = np.searchsorted(bordas, valores, side="right") - 1
+    return np.clip(indices, 0, len(bordas) - 2)
+
+
+class Histogramas:
+    """Contagens por faixa de cada variável numérica, por nível × gênero."""
+
+    def __init__(self, bordas: dict, contagens: dict):
+        self.bordas = bordas
+        self.contagens = contagens
+
+    @classmethod
+    def construir(cls, df: pd.DataFrame, colunas, n_bins: int = 20) -> "Histogramas":
+        celula, validos = _celulas(df)
+        bordas, contagens = {}, {}
+        for coluna in colunas:
+            valores = df[coluna].to_numpy(dtype=np.float64)
+            ok = validos & ~np.isnan(valores)
+            if not ok.any():
+                continue
+            bordas[coluna] = _bordas(valores[ok], n_bins)
+            n = len(bordas[coluna]) - 1
+            indices = celula[ok] * n + _indices_bins(valores[ok], bordas[coluna])
+            contagens[coluna] = np.bincount(
+                indices, minlength=len(NIVEIS) * len(GENEROS) * n
+            ).reshape(len(NIVEIS), len(GENEROS), n)
+        return cls(bordas, contagens)
+
+    def por_nivel(self, coluna: str, niveis=None, generos=None) -> pd.DataFrame:
+        # Tabela faixa × nível (índice = centro da faixa).
+        pos_niveis = _posicoes(niveis, NIVEIS)
+        cubo = self.contagens[coluna]
+        fatia = cubo[np.ix_(pos_niveis, _posicoes(generos, GENEROS))].sum(axis=1)
+        bordas = self.bordas[coluna]
+        return pd.DataFrame(
+            fatia.T,
+            index=(bordas[1:] + bordas[:-1]) / 2,
+            columns=[NIVEIS[i] for i in pos_niveis],
+        )
+
+    def largura(self, coluna: str) -> float:
+        return float(np.diff(self.bordas[coluna]).min())
+
+
+class GradeDispersao:
+    """Grade 2D de densidade (x × y) por nível × gênero para dispersões grandes."""
+
+    def __init__(self, x: str, y: str, bordas_x, bordas_y, contagens: np.ndarray):
+        self.x, self.y = x, y
+        self.bordas_x, self.bordas_y = bordas_x, bordas_y
+        self.contagens = contagens
+
+    @classmethod
+    def construir(
+        cls, df: pd.DataFrame, x: str, y: str, resolucao: int = 60
+    ) -> "GradeDispersao":
+        celula, validos = _celulas(df)
+        vx = df[x].to_numpy(dtype=np.float64)
+        vy = df[y].to_numpy(dtype=np.float64)
+        ok = validos & ~np.isnan(vx) & ~np.isnan(vy)
+        bordas_x = np.histogram_bin_edges(vx[ok], bins=resolucao)
+        bordas_y = np.histogram_bin_edges(vy[ok], bins=resolucao)
+        nx, ny = len(bordas_x) - 1, len(bordas_y) - 1
+        indices = (
+            celula[ok] * nx + _indices_bins(vx[ok], bordas_x)
+        ) * ny + _indices_bins(vy[ok], bordas_y)
+        contagens = np.bincount(
+            indices, minlength=len(NIVEIS) * len(GENEROS) * nx * ny
+        ).reshape(len(NIVEIS), len(GENEROS), nx, ny)
+        return cls(x, y, bordas_x, bordas_y, contagens)
+
+    def pontos(self, niveis=None, generos=None) -> pd.DataFrame:
+        # Uma linha por célula não vazia da grade: centro, nível e contagem.
+        pos_niveis = _posicoes(niveis, NIVEIS)
+        fatia = self.contagens[
+            np.ix_(pos_niveis, _posicoes(generos, GENEROS))
+        ].sum(axis=1)
+        nivel, i, j = np.nonzero(fatia)
+        centros_x = (self.bordas_x[1:] + self.bordas_x[:-1]) / 2
+        centros_y = (self.bordas_y[1:] + self.bordas_y[:-1]) / 2
+        return pd.DataFrame(
+            {
+                self.x: centros_x[i],
+                self.y: centros_y[j],
+                "Obesity_level": np.asarray(NIVEIS)[pos_niveis][nivel],
+                "Quantidade": fatia[nivel, i, j],
+            }
+        )
+
+
+class MomentosSegmento:
+    """Estatísticas suficientes (n, somas, produtos cruzados) por nível × gênero.
+
+    Os valores são deslocados por uma referência fixa (média da base inicial)
+    para evitar cancelamento numérico ao calcular variâncias.
+    """
+
+    def __init__(self, colunas: list, referencia: np.ndarray):
+        self.colunas = list(colunas)
+        self.referencia = referencia
+        k = len(self.colunas)
+        self.contagem = np.zeros((len(NIVEIS), len(GENEROS)), dtype=np.int64)
+        self.somas = np.zeros((len(NIVEIS), len(GENEROS), k))
+        self.produtos = np.zeros((len(NIVEIS), len(GENEROS), k, k))
+
+    @classmethod
+    def construir(cls, df: pd.DataFrame, colunas) -> "MomentosSegmento":
+        colunas = [c for c in colunas if c in df.columns]
+        valores = df[colunas].to_numpy(dtype=np.float64)
+        referencia = np.nan_to_num(np.nanmean(valores, axis=0)) if len(df) else 0.0
+        momentos = cls(colunas, np.zeros(len(colunas)) + referencia)
+        momentos.atualizar(df)
+        return momentos
+
+    def atualizar(self, df: pd.DataFrame) -> "MomentosSegmento":
+        # Acumula linhas novas; só linhas completas entram nas estatísticas.
+        celula, validos = _celulas(df)
+        valores = df[self.colunas].to_numpy(dtype=np.float64) - self.referencia
+        validos &= ~np.isnan(valores).any(axis=1)
+        for indice in np.unique(celula[validos]):
+            bloco = valores[validos & (celula == indice)]
+            i, j = divmod(int(indice), len(GENEROS))
+            self.contagem[i, j] += len(bloco)
+            self.somas[i, j] += bloco.sum(axis=0)
+            self.produtos[i, j] += bloco.T @ bloco
+        return self
+
+    def _combinar(self, niveis, generos):
+        linhas = np.ix_(_posicoes(niveis, NIVEIS), _posicoes(generos, GENEROS))
+        return (
+            int(self.contagem[linhas].sum()),
+            self.somas[linhas].sum(axis=(0, 1)),
+            self.produtos[linhas].sum(axis=(0, 1)),
+        )
+
+    def medias(self, niveis=None, generos=None) -> pd.Series:
+        n, somas, _ = self._combinar(niveis, generos)
+        medias = somas / n + self.referencia if n else np.full(len(self.colunas), np.nan)
+        return pd.Series(medias, index=self.colunas)
+
+    def correlacao(self, niveis=None, generos=None) -> pd.DataFrame:
+        # Pearson a partir dos momentos: cov = E[xx'] - E[x]E[x]'.
+        n, somas, produtos = self._combinar(niveis, generos)
+        k = len(self.colunas)
+        if n < 2:
+            return pd.DataFrame(np.nan, index=self.colunas, columns=self.colunas)
+        media = somas / n
+        covariancia = produtos / n - np.outer(media, media)
+        desvios = np.sqrt(np.clip(np.diag(covariancia), 0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlacao = covariancia / np.outer(desvios, desvios)
+        correlacao = np.clip(correlacao, -1, 1)
+        correlacao[np.arange(k), np.arange(k)] = np.where(desvios > 0, 1.0, np.nan)
+        return pd.DataFrame(correlacao, index=self.colunas, columns=self.colunas)
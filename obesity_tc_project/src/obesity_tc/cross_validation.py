@@ -0,0 +1,140 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, confusion_matrix, f1_score
+from sklearn.model_selection import StratifiedKFold
+
+# Visões da matriz codificada e do alvo na memória compartilhada (por processo).
+_MATRIZ = None
+_ALVO = None
+_ETAPAS = None
+_MEMORIAS = []
+
+
+def _compartilhar(array: np.ndarray):
+    # Copia o array uma única vez para um bloco de memória compartilhada.
+    memoria = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=memoria.buf)[...] = array
+    return memoria, (memoria.name, array.shape, array.dtype.str)
+
+
+def _anexar(descricao) -> np.ndarray:
+    nome, forma, dtype = descricao
+    memoria = shared_memory.SharedMemory(name=nome)
+    # Mantém a referência viva enquanto o worker usa a visão.
+    _MEMORIAS.append(memoria)
+    return np.ndarray(forma, dtype=np.dtype(dtype), buffer=memoria.buf)
+
+
+def _inicializar_worker(desc_matriz, desc_alvo, etapas) -> None:
+    global _MATRIZ, _ALVO, _ETAPAS
+    _MATRIZ = _anexar(desc_matriz)
+    _ALVO = _anexar(desc_alvo)
+    _ETAPAS = etapas
+
+
+def _inicializar_local(matriz, alvo, etapas) -> None:
+    global _MATRIZ, _ALVO, _ETAPAS
+    _MATRIZ, _ALVO, _ETAPAS = matriz, alvo, etapas
+
+
+def avaliar_fold(tarefa) -> dict:
+    # Só os índices do fold trafegam entre processos; os dados vêm da memória
+    # compartilhada.
+    numero, indices_treino, indices_teste = tarefa
+    smote, modelo = clone(_ETAPAS["smote"]), clone(_ETAPAS["model"])
+    inicio, inicio_cpu = time.perf_counter(), time.process_time()
+    matriz, alvo = smote.fit_resample(_MATRIZ[indices_treino], _ALVO[indices_treino])
+    modelo.fit(matriz, alvo)
+    predicoes = modelo.predict(_MATRIZ[indices_teste])
+    alvo_teste = _ALVO[indices_teste]
+    return {
+        "fold": numero,
+        "n_treino": int(len(indices_treino)),
+        "n_teste": int(len(indices_teste)),
+        "acuracia": float(accuracy_score(alvo_teste, predicoes)),
+        "f1_macro": float(f1_score(alvo_teste, predicoes, average="macro")),
+        "matriz_confusao": confusion_matrix(
+            alvo_teste, predicoes, labels=np.arange(_ETAPAS["n_classes"])
+        ).tolist(),
+        "tempo_s": time.perf_counter() - inicio,
+        "tempo_cpu_s": time.process_time() - inicio_cpu,
+    }
+
+
+def validar_cruzado(
+    pipeline,
+    entradas,
+    alvo,
+    n_folds: int = 5,
+    workers: int = 1,
+    random_state: int = 42,
+) -> dict:
+    # O ColumnTransformer é ajustado uma vez na base toda: MinMax, one-hot e os
+    # códigos ordinais não usam o alvo, e a matriz codificada é a que vai para a
+    # memória compartilhada.
+    classes = sorted(np.unique(np.asarray(alvo)).tolist())
+    matriz = clone(pipeline.named_steps["preprocess"]).fit_transform(entradas)
+    if hasattr(matriz, "toarray"):
+        matriz = matriz.toarray()
+    matriz = np.ascontiguousarray(matriz)
+    codigos = np.searchsorted(classes, np.asarray(alvo)).astype(np.int16)
+
+    modelo = clone(pipeline.named_steps["model"]).set_params(n_jobs=1)
+    etapas = {
+        "smote": pipeline.named_steps["smote"],
+        "model": modelo,
+        "n_classes": len(classes),
+    }
+    divisor = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    tarefas = [
+        (numero, treino, teste)
+        for numero, (treino, teste) in enumerate(divisor.split(matriz, codigos), 1)
+    ]
+
+    inicio = time.perf_counter()
+    memorias = []
+    try:
+        if workers <= 1:
+            # No próprio processo: as visões globais apontam para os arrays locais.
+            _inicializar_local(matriz, codigos, etapas)
+            folds = [avaliar_fold(t) for t in tarefas]
+        else:
+            memoria_matriz, desc_matriz = _compartilhar(matriz)
+            memorias.append(memoria_matriz)
+            memoria_alvo, desc_alvo = _compartilhar(codigos)
+            memorias.append(memoria_alvo)
+            with ProcessPoolExecutor(
+                max_workers=min(workers, n_folds),
+                initializer=_inicializar_worker,
+                initargs=(desc_matriz, desc_alvo, etapas),
+            ) as pool:
+                folds = list(pool.map(avaliar_fold, tarefas))
+    finally:
+        for memoria in memorias:
+            memoria.close()
+            memoria.unlink()
+    tempo_total = time.perf_counter() - inicio
+
+    acuracias = np.asarray([f["acuracia"] for f in folds])
+    # Tempo de CPU do fold: não infla quando os processos disputam núcleos.
+    tempo_serial = sum(f["tempo_cpu_s"] for f in folds)
+    return {
+        "n_folds": n_folds,
+        "workers": int(min(max(workers, 1), n_folds)),
+        "classes_original": classes,
+        "acuracia_media": float(acuracias.mean()),
+        "acuracia_desvio": float(acuracias.std(ddof=1)) if len(acuracias) > 1 else 0.0,
+        "f1_macro_medio": float(np.mean([f["f1_macro"] for f in folds])),
+        "matriz_confusao_total": np.sum(
+            [f["matriz_confusao"] for f in folds], axis=0
+        ).tolist(),
+        # Escalonamento: CPU somada dos folds (equivalente serial) / relógio.
+        "tempo_total_s": tempo_total,
+        "tempo_serial_s": tempo_serial,
+        "aceleracao": tempo_serial / tempo_total if tempo_total > 0 else None,
+        "folds": folds,
+    }
@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeClassifier
+
+from src.obesity_tc.make_dataset import COLUNAS_ENTRADA, preprocessar_base
+from src.obesity_tc.synthetic import ajustar_perfil, gerar_linhas
+
+TIPOS_ALUNO = ["arvore", "hgb"]
+
+
+def gerar_entradas_sinteticas(
+    entradas_treino: pd.DataFrame, alvo_treino: pd.Series, n_linhas: int, seed: int
+) -> pd.DataFrame:
+    # Perfil ajustado só nas linhas de treino (o teste não vaza para o aluno).
+    base = entradas_treino[COLUNAS_ENTRADA].astype(
+        {c: object for c in COLUNAS_ENTRADA if entradas_treino[c].dtype == "category"}
+    )
+    perfil = ajustar_perfil(base.assign(Obesity=alvo_treino.to_numpy()), "Obesity")
+    sinteticas = gerar_linhas(perfil, n_linhas, np.random.default_rng(seed))
+    df_limpo = preprocessar_base(sinteticas, coluna_alvo="Obesity")
+    return df_limpo.drop(columns=["Obesity_level"])[entradas_treino.columns]
+
+
+def build_aluno(preprocessador, tipo: str = "arvore", max_depth=12, random_state=42):
+    if tipo == "arvore":
+        modelo = DecisionTreeClassifier(max_depth=max_depth, random_state=random_state)
+    elif tipo == "hgb":
+        modelo = HistGradientBoostingClassifier(
+            max_iter=100, max_depth=max_depth, random_state=random_state
+        )
+    else:
+        raise ValueError(f"Tipo de aluno desconhecido: {tipo}")
+    return Pipeline(steps=[("preprocess", clone(preprocessador)), ("model", modelo)])
+
+
+def destilar(
+    professor,
+    entradas_treino: pd.DataFrame,
+    alvo_treino: pd.Series,
+    tipo: str = "arvore",
+    n_sinteticas: int = 20_000,
+    max_depth=12,
+    random_state: int = 42,
+):
+    # O aluno aprende os rótulos do professor (reais + sintéticos), não o alvo real.
+    sinteticas = gerar_entradas_sinteticas(
+        entradas_treino, alvo_treino, n_sinteticas, random_state
+    )
+    entradas = pd.concat([entradas_treino, sinteticas], ignore_index=True)
+    rotulos = professor.predict(entradas)
+    aluno = build_aluno(
+        professor.named_steps["preprocess"], tipo, max_depth, random_state
+    )
+    return aluno.fit(entradas, rotulos)
+
+
+def _latencia_ms(modelo, entradas: pd.DataFrame, repeticoes: int = 20) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        modelo.predict(entradas)
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def avaliar_aluno(aluno, professor, entradas_teste, alvo_teste, predicoes_professor):
+    predicoes = aluno.predict(entradas_teste)
+    uma_linha = entradas_teste.head(1)
+    return {
+        "acuracia": float(accuracy_score(alvo_teste, predicoes)),
+        "concordancia_professor": float(np.mean(predicoes == predicoes_professor)),
+        "latencia_1_linha_ms": _latencia_ms(aluno, uma_linha),
+        "latencia_1_linha_professor_ms": _latencia_ms(professor, uma_linha),
+        "latencia_teste_ms": _latencia_ms(aluno, entradas_teste, 5),
+        "latencia_teste_professor_ms": _latencia_ms(professor, entradas_teste, 5),
+    }
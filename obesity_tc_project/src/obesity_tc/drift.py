@@ -0,0 +1,331 @@
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava de arquivo, um gravador por estado
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from src.obesity_tc.make_dataset import COLUNAS_DISCRETAS_ARREDONDAR, COLUNAS_ENTRADA
+from src.obesity_tc.registry import ARQUIVO_PERFIL, caminho_atual
+
+# Faixas usuais do PSI: abaixo de 0,1 estável; até 0,25 moderada; acima, alta.
+LIMITES_PSI = (0.1, 0.25)
+# Suavização das proporções (evita log de zero em faixas vazias).
+EPSILON = 1e-4
+COLUNA_CLASSE = "classe_prevista"
+OUTROS = "__outros__"
+
+
+def _proporcoes(contagens: np.ndarray) -> np.ndarray:
+    contagens = np.asarray(contagens, dtype=float) + EPSILON
+    return contagens / contagens.sum()
+
+
+def psi(referencia, atual) -> float:
+    p, q = _proporcoes(referencia), _proporcoes(atual)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def kl(referencia, atual) -> float:
+    # KL(atual || referência): informação perdida ao descrever a produção pelo treino.
+    p, q = _proporcoes(referencia), _proporcoes(atual)
+    return float(np.sum(q * np.log(q / p)))
+
+
+def classificar_psi(valor: float) -> str:
+    if valor < LIMITES_PSI[0]:
+        return "estável"
+    if valor < LIMITES_PSI[1]:
+        return "moderada"
+    return "alta"
+
+
+class MonitorDeriva:
+    """Histogramas de produção comparados a um perfil de referência do treino.
+
+    Numéricas usam faixas fixas (decis da referência; valores inteiros nas
+    discretas), categóricas e a classe prevista usam as categorias vistas no
+    treino mais uma faixa "outros". Só contagens são guardadas, então a memória
+    não cresce com o volume de predições.
+    """
+
+    def __init__(self, numericas: dict, categoricas: dict):
+        # numericas: coluna -> {"bordas", "referencia"}; categoricas: coluna ->
+        # {"categorias", "referencia"} (inclui a classe prevista).
+        self.numericas = numericas
+        self.categoricas = categoricas
+        self.hash_referencia = hashlib.sha256(
+            json.dumps([numericas, categoricas], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        self._indices = {
+            coluna: {c: i for i, c in enumerate(info["categorias"])}
+            for coluna, info in categoricas.items()
+        }
+        self._trava = threading.Lock()
+        self.reiniciar()
+
+    @classmethod
+    def construir(cls, entradas: pd.DataFrame, predicoes, n_bins: int = 10):
+        numericas, categoricas = {}, {}
+        for coluna in COLUNAS_ENTRADA:
+            if coluna not in entradas.columns:
+                continue
+            serie = entradas[coluna]
+            if pd.api.types.is_numeric_dtype(serie):
+                valores = pd.to_numeric(serie, errors="coerce").dropna().to_numpy(float)
+                if coluna in COLUNAS_DISCRETAS_ARREDONDAR:
+                    # Uma faixa por valor inteiro observado.
+                    bordas = np.unique(np.rint(valores))[:-1] + 0.5
+                else:
+                    quantis = np.linspace(0, 1, n_bins + 1)[1:-1]
+                    bordas = np.unique(np.quantile(valores, quantis))
+                numericas[coluna] = {"bordas": bordas.tolist()}
+            else:
+                categorias = sorted(serie.dropna().astype(str).str.strip().unique())
+                categoricas[coluna] = {"categorias": categorias + [OUTROS]}
+        classes = sorted(pd.unique(np.asarray(predicoes, dtype=object)).tolist())
+        categoricas[COLUNA_CLASSE] = {"categorias": classes + [OUTROS]}
+
+        # As contagens da referência saem do mesmo código que conta a produção.
+        esqueleto = cls(numericas, categoricas)
+        esqueleto.atualizar(entradas, predicoes)
+        for coluna, contagem in esqueleto.contagens.items():
+            (numericas.get(coluna) or categoricas[coluna])["referencia"] = (
+                contagem.tolist()
+            )
+        return cls(numericas, categoricas)
+
+    def reiniciar(self) -> None:
+        with self._trava:
+            self.n = 0
+            self.contagens = {
+                coluna: np.zeros(len(info["bordas"]) + 1, dtype=np.int64)
+                for coluna, info in self.numericas.items()
+            }
+            self.contagens.update(
+                {
+                    coluna: np.zeros(len(info["categorias"]), dtype=np.int64)
+                    for coluna, info in self.categoricas.items()
+                }
+            )
+            self._marcar_persistido()
+
+    def _marcar_persistido(self) -> None:
+        # Contagens já refletidas no arquivo de estado; o resto é delta local.
+        self._n_persistido = self.n
+        self._persistido = {c: v.copy() for c, v in self.contagens.items()}
+        self._persistido_em = time.monotonic()
+
+    def pendentes(self) -> int:
+        # Linhas contadas desde a última gravação ou carga do estado.
+        with self._trava:
+            return self.n - self._n_persistido
+
+    def salvar_pendentes(
+        self, caminho: Path, minimo: int = 1, intervalo_s: float = None
+    ) -> bool:
+        # Grava com `minimo` linhas pendentes ou, havendo alguma, quando a última
+        # gravação tem mais de `intervalo_s`. Independe do n global (outras
+        # réplicas também somam ao arquivo).
+        pendentes = self.pendentes()
+        vencido = (
+            intervalo_s is not None
+            and time.monotonic() - self._persistido_em >= intervalo_s
+        )
+        if pendentes >= minimo or (pendentes and vencido):
+            self.salvar_estado(caminho)
+            return True
+        return False
+
+    def _contar_categorias(self, coluna: str, valores) -> np.ndarray:
+        categorias = self.categoricas[coluna]["categorias"]
+        codigos = pd.Categorical(
+            pd.Series(valores, dtype=object).astype(str).str.strip(),
+            categories=categorias,
+        ).codes
+        # Código -1 (categoria nunca vista no treino) cai na faixa "outros".
+        codigos = np.where(codigos < 0, len(categorias) - 1, codigos)
+        return np.bincount(codigos, minlength=len(categorias))
+
+    def atualizar(self, entradas: pd.DataFrame, predicoes) -> None:
+        parciais = {}
+        for coluna, info in self.numericas.items():
+            if coluna not in entradas.columns:
+                continue
+            valores = pd.to_numeric(entradas[coluna], errors="coerce").to_numpy(float)
+            valores = valores[~np.isnan(valores)]
+            if coluna in COLUNAS_DISCRETAS_ARREDONDAR:
+                valores = np.rint(valores)
+            faixas = np.searchsorted(info["bordas"], valores, side="right")
+            parciais[coluna] = np.bincount(faixas, minlength=len(info["bordas"]) + 1)
+        for coluna in self.categoricas:
+            if coluna in entradas.columns:
+                parciais[coluna] = self._contar_categorias(
+                    coluna, entradas[coluna].dropna()
+                )
+        parciais[COLUNA_CLASSE] = self._contar_categorias(
+            COLUNA_CLASSE, np.asarray(predicoes, dtype=object)
+        )
+        with self._trava:
+            self.n += len(entradas)
+            for coluna, contagem in parciais.items():
+                self.contagens[coluna] += contagem
+
+    def atualizar_registro(self, registro: dict, predicao) -> None:
+        # Caminho de uma linha só (app): sem DataFrame, alguns microssegundos.
+        with self._trava:
+            self.n += 1
+            for coluna, info in self.numericas.items():
+                valor = registro.get(coluna)
+                if valor is None or valor != valor:
+                    continue
+                valor = float(valor)
+                if coluna in COLUNAS_DISCRETAS_ARREDONDAR:
+                    valor = float(round(valor))
+                self.contagens[coluna][bisect.bisect_right(info["bordas"], valor)] += 1
+            for coluna, indices in self._indices.items():
+                valor = predicao if coluna == COLUNA_CLASSE else registro.get(coluna)
+                if valor is None:
+                    continue
+                self.contagens[coluna][indices.get(str(valor).strip(), -1)] += 1
+
+    def comparar(self) -> pd.DataFrame:
+        registros = []
+        with self._trava:
+            grupos = (("numérica", self.numericas), ("categórica", self.categoricas))
+            for tipo, colunas in grupos:
+                for coluna, info in colunas.items():
+                    atual = self.contagens[coluna]
+                    if atual.sum() == 0:
+                        continue
+                    valor_psi = psi(info["referencia"], atual)
+                    registros.append(
+                        {
+                            "variavel": coluna,
+                            "tipo": tipo,
+                            "n": int(atual.sum()),
+                            "psi": valor_psi,
+                            "kl": kl(info["referencia"], atual),
+                            "deriva": classificar_psi(valor_psi),
+                        }
+                    )
+        colunas = ["variavel", "tipo", "n", "psi", "kl", "deriva"]
+        return pd.DataFrame(registros, columns=colunas).sort_values(
+            "psi", ascending=False, ignore_index=True
+        )
+
+    def perfil(self) -> dict:
+        return {"numericas": self.numericas, "categoricas": self.categoricas}
+
+    def salvar_perfil(self, caminho: Path) -> None:
+        _gravar_json(caminho, self.perfil())
+
+    @classmethod
+    def carregar_perfil(cls, caminho: Path):
+        perfil = json.loads(Path(caminho).read_text(encoding="utf-8"))
+        return cls(perfil["numericas"], perfil["categoricas"])
+
+    def _ler_estado(self, caminho: Path):
+        # Só vale um estado gerado contra a mesma referência (mesmo treino).
+        try:
+            estado = json.loads(Path(caminho).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if estado.get("hash_referencia") != self.hash_referencia:
+            return None
+        return estado
+
+    def salvar_estado(self, caminho: Path) -> None:
+        """Soma ao arquivo o que foi contado desde a última gravação ou carga.
+
+        Vários processos (réplicas do app, lotes simultâneos) podem gravar o
+        mesmo estado: a leitura, a soma e a escrita acontecem sob uma trava de
+        arquivo, e cada processo só contribui com o próprio delta. Sem fcntl
+        (Windows), só um processo por arquivo é suportado.
+        """
+        caminho = Path(caminho)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        with open(caminho.with_name(f".{caminho.name}.lock"), "w") as trava_arquivo:
+            if fcntl is not None:
+                fcntl.flock(trava_arquivo, fcntl.LOCK_EX)
+            disco = self._ler_estado(caminho) or {"n": 0, "contagens": {}}
+            with self._trava:
+                self.n = int(disco["n"]) + self.n - self._n_persistido
+                for coluna, contagem in self.contagens.items():
+                    delta = contagem - self._persistido[coluna]
+                    anterior = disco["contagens"].get(coluna)
+                    if anterior is not None and len(anterior) == len(contagem):
+                        delta = delta + np.asarray(anterior, dtype=np.int64)
+                    self.contagens[coluna] = delta
+                self._marcar_persistido()
+                estado = {
+                    "hash_referencia": self.hash_referencia,
+                    "n": self.n,
+                    "contagens": {c: v.tolist() for c, v in self.contagens.items()},
+                }
+            _gravar_json(caminho, estado)
+
+    def carregar_estado(self, caminho: Path) -> bool:
+        # Só retoma contagens geradas contra a mesma referência (mesmo treino).
+        estado = self._ler_estado(caminho)
+        if estado is None:
+            return False
+        with self._trava:
+            self.n = int(estado["n"])
+            for coluna, contagem in estado["contagens"].items():
+                if coluna in self.contagens:
+                    self.contagens[coluna] = np.asarray(contagem, dtype=np.int64)
+            self._marcar_persistido()
+        return True
+
+
+def _gravar_json(caminho: Path, conteudo: dict) -> None:
+    # Escrita atômica: leitores nunca veem um JSON pela metade.
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_suffix(f".{os.getpid()}.tmp")
+    temporario.write_text(json.dumps(conteudo, ensure_ascii=False), encoding="utf-8")
+    os.replace(temporario, caminho)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--reference", default=None, help="Perfil (padrão: o da versão ativa)."
+    )
+    parser.add_argument(
+        "--state",
+        nargs="+",
+        default=[
+            "models/deriva_app.json",
+            "models/deriva_lote.json",
+            "models/deriva_api.json",
+        ],
+        help="Estados acumulados pelo app, pelo predict.py e pelo serve.py.",
+    )
+    args = parser.parse_args()
+    args.reference = args.reference or caminho_atual(ARQUIVO_PERFIL)
+
+    if not Path(args.reference).exists():
+        raise SystemExit("Perfil de referência não encontrado. Rode o train.py.")
+    for caminho in args.state:
+        monitor = MonitorDeriva.carregar_perfil(args.reference)
+        if not monitor.carregar_estado(caminho):
+            print(f"{caminho}: sem contagens para a referência atual.")
+            continue
+        print(f"{caminho}: {monitor.n} predições")
+        print(monitor.comparar().to_string(index=False, float_format="%.4f"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import functools
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+# Medidor ativo no processo; None mantém a instrumentação desligada, e aí cada
+# etapa custa só uma checagem de variável global.
+_MEDIDOR = None
+_NULO = nullcontext()
+
+
+class Medidor:
+    """Acumula tempo de relógio, tempo de CPU e pico de memória por etapa."""
+
+    def __init__(self, memoria: bool = True):
+        self.memoria = memoria
+        self.etapas = {}
+        self._pilha = []
+
+    @contextmanager
+    def medir(self, nome: str):
+        quadro = {"pico_filhos": 0}
+        if self.memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            # O reset abaixo apagaria o pico já visto pela etapa externa.
+            self._repassar_pico(pico)
+            tracemalloc.reset_peak()
+            quadro["memoria_inicial"] = atual
+        self._pilha.append(quadro)
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            duracao_cpu = time.process_time() - inicio_cpu
+            self._pilha.pop()
+            pico_mb = None
+            if self.memoria:
+                pico = max(tracemalloc.get_traced_memory()[1], quadro["pico_filhos"])
+                pico_mb = (pico - quadro["memoria_inicial"]) / 2**20
+                self._repassar_pico(pico)
+            self._registrar(nome, duracao, duracao_cpu, pico_mb)
+
+    def _repassar_pico(self, pico: int) -> None:
+        if self._pilha:
+            self._pilha[-1]["pico_filhos"] = max(self._pilha[-1]["pico_filhos"], pico)
+
+    def _registrar(self, nome, duracao, duracao_cpu, pico_mb) -> None:
+        registro = self.etapas.setdefault(
+            nome, {"chamadas": 0, "wall_s": 0.0, "cpu_s": 0.0, "pico_mb": None}
+        )
+        registro["chamadas"] += 1
+        registro["wall_s"] += duracao
+        registro["cpu_s"] += duracao_cpu
+        if pico_mb is not None:
+            registro["pico_mb"] = max(registro["pico_mb"] or 0.0, pico_mb)
+
+    def reiniciar(self, manter: dict = None) -> None:
+        # Descarta o acumulado (ex.: ajustes da varredura antes do ajuste final),
+        # opcionalmente partindo de um resumo anterior.
+        self.etapas = {nome: dict(r) for nome, r in (manter or {}).items()}
+
+    def resumo(self) -> dict:
+        return {nome: dict(valores) for nome, valores in self.etapas.items()}
+
+    def imprimir(self, etapas: dict = None) -> None:
+        # Sem argumento imprime o acumulado; com um resumo, exatamente o que foi salvo.
+        for nome, r in (self.etapas if etapas is None else etapas).items():
+            pico = f"{r['pico_mb']:.1f} MB" if r["pico_mb"] is not None else "-"
+            print(
+                f"  {nome:<28} {r['chamadas']:>4}x | wall {r['wall_s']:.3f}s"
+                f" | cpu {r['cpu_s']:.3f}s | pico {pico}"
+            )
+
+
+class JanelaTempos:
+    """Últimas durações (ms) compartilhadas entre threads, com percentis."""
+
+    def __init__(self, tamanho: int = 500):
+        self._tempos = deque(maxlen=tamanho)
+        self._trava = threading.Lock()
+
+    def registrar(self, duracao_ms: float) -> None:
+        with self._trava:
+            self._tempos.append(duracao_ms)
+
+    def percentis(self, *quantis) -> tuple:
+        # Percentis sobre uma cópia tirada sob a trava (deque muda durante a leitura).
+        with self._trava:
+            tempos = list(self._tempos)
+        if not tempos:
+            return len(tempos), tuple(float("nan") for _ in quantis)
+        return len(tempos), tuple(float(np.percentile(tempos, q)) for q in quantis)
+
+
+def ativar(memoria: bool = True) -> Medidor:
+    global _MEDIDOR
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _MEDIDOR = Medidor(memoria=memoria)
+    return _MEDIDOR
+
+
+def desativar() -> None:
+    global _MEDIDOR
+    if _MEDIDOR is not None and _MEDIDOR.memoria and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _MEDIDOR = None
+
+
+def etapa(nome: str):
+    # Uso: with etapa("smote.fit_resample"): ...
+    if _MEDIDOR is None:
+        return _NULO
+    return _MEDIDOR.medir(nome)
+
+
+def medido(nome: str):
+    # Decorador para funções inteiras (ex.: preprocessar_base).
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if _MEDIDOR is None:
+                return funcao(*args, **kwargs)
+            with _MEDIDOR.medir(nome):
+                return funcao(*args, **kwargs)
+
+        return envoltorio
+
+    return decorador
+
+
+def prever_por_etapas(pipeline, entradas):
+    # Mesmo resultado de pipeline.predict (o SMOTE não atua na predição), com o
+    # transform e o predict medidos separadamente.
+    if _MEDIDOR is None:
+        return pipeline.predict(entradas)
+    if not hasattr(pipeline, "named_steps"):
+        # Floresta compacta ou modelo solto: uma etapa só.
+        with etapa("model.predict"):
+            return pipeline.predict(entradas)
+    with etapa("preprocess.transform"):
+        matriz = pipeline.named_steps["preprocess"].transform(entradas)
+    with etapa("model.predict"):
+        return pipeline.named_steps["model"].predict(matriz)
@@ -1,12 +1,40 @@
 import argparse
+import hashlib
+import inspect
+import json
+import os
+import warnings
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 
+from src.obesity_tc.instrumentation import medido
+from src.obesity_tc.profiling import perfilar
+
 # Colunas discretas que chegam com ruído decimal e precisam de arredondamento.
 COLUNAS_DISCRETAS_ARREDONDAR = ["FCVC", "NCP", "CH2O", "FAF", "TUE"]
 
+# Campos de entrada do questionário, na ordem usada pelo app.
+COLUNAS_ENTRADA = [
+    "Gender",
+    "Age",
+    "Height",
+    "Weight",
+    "family_history",
+    "FAVC",
+    "FCVC",
+    "NCP",
+    "CAEC",
+    "SMOKE",
+    "CH2O",
+    "SCC",
+    "FAF",
+    "TUE",
+    "CALC",
+    "MTRANS",
+]
+
 COLUNAS_PT_BR = {
     "Gender": "Gênero",
     "Age": "Idade",
@@ -55,6 +83,37 @@ MAPA_NIVEL_OBESIDADE_PT = {
 }
 
 
+# Esquema compacto da base processada: categorias fixas, escores em int8 e
+# medidas em float32.
+CATEGORIAS_FIXAS = {
+    "Gender": ["Female", "Male"],
+    "family_history": ["no", "yes"],
+    "FAVC": ["no", "yes"],
+    "SMOKE": ["no", "yes"],
+    "SCC": ["no", "yes"],
+    "CAEC": ["no", "Sometimes", "Frequently", "Always"],
+    "CALC": ["no", "Sometimes", "Frequently", "Always"],
+    "MTRANS": list(MAPA_TRANSPORTE_PT),
+    "Obesity_level": list(MAPA_NIVEL_OBESIDADE_PT),
+}
+COLUNAS_FLOAT32 = ["Age", "Height", "Weight", "BMI"]
+
+
+def hash_arquivo(caminho: Path, tamanho_bloco: int = 1 << 20) -> str:
+    # Hash de conteúdo (SHA-256) lido em blocos para não carregar o arquivo inteiro.
+    digest = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def hash_linhas(df: pd.DataFrame) -> str:
+    # Hash do conteúdo das linhas (independe do índice e da formatação do CSV).
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+
 def calcular_imc(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
     # Evita divisão por zero.
@@ -63,20 +122,53 @@ def calcular_imc(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def aplicar_esquema(df: pd.DataFrame) -> pd.DataFrame:
+    # Converte as colunas conhecidas para os tipos compactos do esquema.
+    for coluna, categorias in CATEGORIAS_FIXAS.items():
+        if coluna in df.columns:
+            # Valores fora da lista fixa viram categorias extras (com aviso), em vez
+            # de NaN: o dado chega às saídas e ao treino como veio.
+            presentes = pd.unique(df[coluna].dropna())
+            novas = sorted({str(v) for v in presentes} - set(categorias))
+            if novas:
+                warnings.warn(
+                    f"{coluna}: valores fora do esquema mantidos como categorias "
+                    f"extras: {', '.join(novas)}",
+                    stacklevel=2,
+                )
+                valores = df[coluna].astype(object)
+                df[coluna] = valores.where(valores.isna(), valores.astype(str))
+            df[coluna] = pd.Categorical(df[coluna], categories=categorias + novas)
+    for coluna in COLUNAS_DISCRETAS_ARREDONDAR:
+        if coluna in df.columns:
+            # int8 quando não há ausentes; caso contrário mantém o inteiro anulável.
+            tipo = "Int8" if df[coluna].isna().any() else "int8"
+            df[coluna] = df[coluna].astype(tipo)
+    for coluna in COLUNAS_FLOAT32:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype(np.float32)
+    return df
+
+
+@medido("preprocessar_base")
 def preprocessar_base(df: pd.DataFrame, coluna_alvo: str = "Obesity") -> pd.DataFrame:
     df = df.copy()
 
-    # Remove espaços extras em strings.
+    # Remove espaços extras em strings (ausentes continuam ausentes, não "nan").
     for coluna in df.columns:
         if df[coluna].dtype == "object":
-            df[coluna] = df[coluna].astype(str).str.strip()
+            valores = df[coluna]
+            df[coluna] = valores.astype(str).str.strip().where(valores.notna())
 
     # Arredondamento de variáveis discretas com ruído decimal.
     for coluna in COLUNAS_DISCRETAS_ARREDONDAR:
         if coluna in df.columns:
-            df[coluna] = pd.to_numeric(df[coluna], errors="coerce").round(0).astype(
-                "Int64"
-            )
+            df[coluna] = pd.to_numeric(df[coluna], errors="coerce").round(0)
+
+    # Medidas em float32 antes do IMC, para que ele também saia em float32.
+    for coluna in ["Height", "Weight"]:
+        if coluna in df.columns:
+            df[coluna] = pd.to_numeric(df[coluna], errors="coerce").astype(np.float32)
 
     # Calcula o IMC para uso no treino e análises.
     df = calcular_imc(df)
@@ -84,30 +176,40 @@ def preprocessar_base(df: pd.DataFrame, coluna_alvo: str = "Obesity") -> pd.Data
     # Normaliza nome do alvo (interno).
     if coluna_alvo in df.columns:
         df = df.rename(columns={coluna_alvo: "Obesity_level"})
-    return df
+    return aplicar_esquema(df)
+
 
+def traduzir_coluna(serie: pd.Series, mapa: dict) -> pd.Series:
+    # Em colunas categóricas basta renomear as categorias (custo por categoria).
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.rename_categories(
+            {c: mapa.get(c, c) for c in serie.cat.categories}
+        )
+    return serie.map(mapa).fillna(serie)
 
+
+@medido("traduzir_ptbr")
 def traduzir_ptbr(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
 
     # Traduz valores categóricos para PT-BR.
     if "Gender" in df.columns:
-        df["Gender"] = df["Gender"].map(MAPA_GENERO_PT).fillna(df["Gender"])
+        df["Gender"] = traduzir_coluna(df["Gender"], MAPA_GENERO_PT)
 
     for coluna in ["family_history", "FAVC", "SMOKE", "SCC"]:
         if coluna in df.columns:
-            df[coluna] = df[coluna].map(MAPA_SIM_NAO_PT).fillna(df[coluna])
+            df[coluna] = traduzir_coluna(df[coluna], MAPA_SIM_NAO_PT)
 
     for coluna in ["CAEC", "CALC"]:
         if coluna in df.columns:
-            df[coluna] = df[coluna].map(MAPA_FREQUENCIA_PT).fillna(df[coluna])
+            df[coluna] = traduzir_coluna(df[coluna], MAPA_FREQUENCIA_PT)
 
     if "MTRANS" in df.columns:
-        df["MTRANS"] = df["MTRANS"].map(MAPA_TRANSPORTE_PT).fillna(df["MTRANS"])
+        df["MTRANS"] = traduzir_coluna(df["MTRANS"], MAPA_TRANSPORTE_PT)
 
     for coluna in ["Obesity", "Obesity_level"]:
         if coluna in df.columns:
-            df[coluna] = df[coluna].map(MAPA_NIVEL_OBESIDADE_PT).fillna(df[coluna])
+            df[coluna] = traduzir_coluna(df[coluna], MAPA_NIVEL_OBESIDADE_PT)
 
     # Traduz nomes das colunas para facilitar visualização.
     df = df.rename(columns={k: v for k, v in COLUNAS_PT_BR.items() if k in df.columns})
@@ -126,21 +228,139 @@ def salvar_base_ptbr(
     return output_path
 
 
+def versao_preprocessamento() -> str:
+    # Versão derivada do próprio código: muda quando o pré-processamento muda.
+    fontes = [
+        inspect.getsource(calcular_imc),
+        inspect.getsource(preprocessar_base),
+        inspect.getsource(aplicar_esquema),
+        repr(COLUNAS_DISCRETAS_ARREDONDAR),
+        repr(CATEGORIAS_FIXAS),
+        repr(COLUNAS_FLOAT32),
+    ]
+    return hashlib.sha256("".join(fontes).encode("utf-8")).hexdigest()[:12]
+
+
+def _ler_manifesto(cache_dir: Path) -> dict:
+    try:
+        return json.loads((cache_dir / "manifesto.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"hashes": {}, "saidas": {}}
+
+
+def _gravar_manifesto(cache_dir: Path, manifesto: dict) -> None:
+    # Escrita atômica para não deixar um manifesto pela metade.
+    temporario = cache_dir / f"manifesto.json.{os.getpid()}.tmp"
+    temporario.write_text(json.dumps(manifesto, indent=2), encoding="utf-8")
+    os.replace(temporario, cache_dir / "manifesto.json")
+
+
+def _hash_com_memo(caminho: Path, manifesto: dict):
+    # O stat só evita reler o arquivo; quem decide a validade é o hash do conteúdo.
+    # Devolve (hash, memo_alterado): só um memo novo precisa ir para o disco.
+    stat = caminho.stat()
+    assinatura = [stat.st_mtime_ns, stat.st_size]
+    chave = str(caminho.resolve())
+    registro = manifesto["hashes"].get(chave)
+    if registro and registro[:2] == assinatura:
+        return registro[2], False
+    conteudo = hash_arquivo(caminho)
+    manifesto["hashes"][chave] = assinatura + [conteudo]
+    return conteudo, True
+
+
+def chave_base_processada(
+    data_path: Path, coluna_alvo: str = "Obesity", cache_dir: Path = None
+) -> str:
+    data_path = Path(data_path)
+    cache_dir = Path(cache_dir) if cache_dir else data_path.parent / ".cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifesto = _ler_manifesto(cache_dir)
+    hash_dados, alterado = _hash_com_memo(data_path, manifesto)
+    # Chamada a cada rerun do dashboard: sem mudança no arquivo, nada é gravado.
+    if alterado:
+        _gravar_manifesto(cache_dir, manifesto)
+    base = f"{hash_dados}|{coluna_alvo}|{versao_preprocessamento()}"
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()[:16]
+
+
+def carregar_base_processada(
+    data_path: Path = Path("data/raw/Obesity.csv"),
+    coluna_alvo: str = "Obesity",
+    cache_dir: Path = None,
+    registrar=None,
+) -> pd.DataFrame:
+    # Base pré-processada em Parquet (tipos preservados), chaveada pelo conteúdo do
+    # CSV bruto e pela versão do pré-processamento.
+    # registrar(etapa, acerto) opcional recebe o resultado da consulta ao cache.
+    data_path = Path(data_path)
+    cache_dir = Path(cache_dir) if cache_dir else data_path.parent / ".cache"
+    chave = chave_base_processada(data_path, coluna_alvo, cache_dir)
+    caminho_cache = cache_dir / f"base_{chave}.parquet"
+    if registrar:
+        registrar("preprocessar_base", caminho_cache.exists())
+    if caminho_cache.exists():
+        return pd.read_parquet(caminho_cache)
+
+    df_processado = preprocessar_base(pd.read_csv(data_path), coluna_alvo=coluna_alvo)
+    temporario = caminho_cache.with_suffix(f".{os.getpid()}.tmp")
+    df_processado.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho_cache)
+    return df_processado
+
+
 def atualizar_base_ptbr(
     data_path: Path = Path("data/raw/Obesity.csv"),
     output_path: Path = Path("data/processed/base_traduzida_ptbr.csv"),
     coluna_alvo: str = "Obesity",
+    cache_dir: Path = None,
 ):
     data_path = Path(data_path)
     output_path = Path(output_path)
     if not data_path.exists():
         return None
-    # Evita retrabalho se a base traduzida já estiver atualizada.
-    if output_path.exists() and output_path.stat().st_mtime >= data_path.stat().st_mtime:
+    cache_dir = Path(cache_dir) if cache_dir else data_path.parent / ".cache"
+    # Evita retrabalho se a base traduzida já corresponde ao conteúdo atual.
+    chave = chave_base_processada(data_path, coluna_alvo, cache_dir)
+    manifesto = _ler_manifesto(cache_dir)
+    destino = str(output_path.resolve())
+    if output_path.exists() and manifesto["saidas"].get(destino) == chave:
         return output_path
-    df_raw = pd.read_csv(data_path)
-    df_processado = preprocessar_base(df_raw, coluna_alvo=coluna_alvo)
-    return salvar_base_ptbr(df_processado, output_path)
+    df_processado = carregar_base_processada(data_path, coluna_alvo, cache_dir)
+    salvar_base_ptbr(df_processado, output_path)
+    manifesto = _ler_manifesto(cache_dir)
+    manifesto["saidas"][destino] = chave
+    _gravar_manifesto(cache_dir, manifesto)
+    return output_path
+
+
+def processar_em_blocos(
+    input_path: Path,
+    output_path: Path,
+    output_ptbr: Path = None,
+    coluna_alvo: str = "Obesity",
+    chunksize: int = 100_000,
+):
+    # Lê o CSV bruto em blocos e acrescenta cada bloco às saídas, com memória
+    # constante; o esquema fixo garante a mesma formatação do caminho em memória.
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if output_ptbr:
+        output_ptbr = Path(output_ptbr)
+        output_ptbr.parent.mkdir(parents=True, exist_ok=True)
+
+    n_linhas, n_colunas = 0, 0
+    for i, bloco in enumerate(pd.read_csv(input_path, chunksize=chunksize)):
+        bloco_processado = preprocessar_base(bloco, coluna_alvo=coluna_alvo)
+        opcoes = {"mode": "w" if i == 0 else "a", "header": i == 0, "index": False}
+        bloco_processado.to_csv(output_path, encoding="utf-8", **opcoes)
+        if output_ptbr:
+            traduzir_ptbr(bloco_processado).to_csv(
+                output_ptbr, encoding="utf-8", **opcoes
+            )
+        n_linhas += len(bloco_processado)
+        n_colunas = bloco_processado.shape[1]
+    return n_linhas, n_colunas
 
 
 def main():
@@ -153,8 +373,37 @@ def main():
         default="data/processed/base_traduzida_ptbr.csv",
         help="Caminho para salvar a base traduzida (UTF-8).",
     )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Processa o CSV em blocos desse tamanho (memória constante).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfila a execução (cProfile + pilhas amostradas) em reports/profiles/.",
+    )
     args = parser.parse_args()
 
+    with perfilar("make_dataset", args.input, ativo=args.profile):
+        executar(args)
+
+
+def executar(args):
+    if args.chunksize:
+        n_linhas, n_colunas = processar_em_blocos(
+            args.input,
+            args.output,
+            args.output_ptbr,
+            coluna_alvo=args.target,
+            chunksize=args.chunksize,
+        )
+        print(
+            f"OK: salvou {args.output} com {n_linhas} linhas e {n_colunas} colunas."
+        )
+        return
+
     df = pd.read_csv(args.input)
     df_processado = preprocessar_base(df, coluna_alvo=args.target)
     df_processado.to_csv(args.output, index=False, encoding="utf-8")
@@ -0,0 +1,265 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from joblib import load
+
+from src.obesity_tc.drift import MonitorDeriva
+from src.obesity_tc.instrumentation import ativar, prever_por_etapas
+from src.obesity_tc.make_dataset import preprocessar_base
+from src.obesity_tc.prediction_cache import CachePredicoes
+from src.obesity_tc.registry import ARQUIVO_MODELO, ARQUIVO_PERFIL, caminho_atual
+
+COLUNA_PREDICAO = "Obesity_level_previsto"
+
+# Estado de cada processo do pool: o bundle é carregado uma única vez por worker.
+_PIPELINE = None
+_CACHE = None
+_COLUNA_ALVO = "Obesity"
+
+
+def carregar_pipeline(caminho_modelo: Path, n_jobs: int = None, aluno: bool = False):
+    pacote = load(caminho_modelo)
+    if aluno:
+        # Modelo destilado salvo pelo train.py --student.
+        if "aluno" not in pacote:
+            raise SystemExit(
+                "O bundle não tem modelo aluno; treine com --student arvore|hgb."
+            )
+        return pacote["aluno"]["pipeline"]
+    pipeline = pacote["pipeline"]
+    if n_jobs is not None:
+        # No pool o paralelismo fica nos processos; evita disputa de threads por
+        # núcleo. No próprio processo vale o n_jobs salvo (todos os núcleos).
+        pipeline.named_steps["model"].n_jobs = n_jobs
+    return pipeline
+
+
+def _inicializar_worker(
+    caminho_modelo: str,
+    coluna_alvo: str,
+    tamanho_cache: int = 0,
+    aluno: bool = False,
+    n_jobs: int = 1,
+) -> None:
+    global _PIPELINE, _CACHE, _COLUNA_ALVO
+    _PIPELINE = carregar_pipeline(Path(caminho_modelo), n_jobs=n_jobs, aluno=aluno)
+    _CACHE = (
+        CachePredicoes(caminho_modelo, max_itens=tamanho_cache)
+        if tamanho_cache > 0
+        else None
+    )
+    _COLUNA_ALVO = coluna_alvo
+
+
+def _pontuar_bloco(bloco: pd.DataFrame):
+    if _CACHE is not None:
+        return _CACHE.prever(_PIPELINE, bloco)
+    df_limpo = preprocessar_base(bloco, coluna_alvo=_COLUNA_ALVO)
+    return prever_por_etapas(_PIPELINE, df_limpo)
+
+
+def _gravar_bloco(
+    bloco: pd.DataFrame, predicoes, output_path: Path, primeiro: bool, monitor=None
+):
+    if monitor is not None:
+        # Só contagens por faixa: memória constante qualquer que seja o volume.
+        monitor.atualizar(bloco, predicoes)
+    bloco = bloco.assign(**{COLUNA_PREDICAO: predicoes})
+    bloco.to_csv(
+        output_path,
+        mode="w" if primeiro else "a",
+        header=primeiro,
+        index=False,
+        encoding="utf-8",
+    )
+
+
+def _gravar_cabecalho(input_path: Path, output_path: Path) -> None:
+    # Entrada sem linhas de dados: a saída ainda sai com o cabeçalho completo.
+    colunas = pd.read_csv(input_path, nrows=0).columns
+    pd.DataFrame(columns=[*colunas, COLUNA_PREDICAO]).to_csv(
+        output_path, index=False, encoding="utf-8"
+    )
+
+
+def pontuar_csv(
+    input_path: Path,
+    output_path: Path,
+    model_path: Path = None,
+    coluna_alvo: str = "Obesity",
+    chunksize: int = 100_000,
+    workers: int = 1,
+    tamanho_cache: int = 0,
+    aluno: bool = False,
+    monitor: MonitorDeriva = None,
+) -> int:
+    # Sem caminho explícito, usa a versão ativa do registro de modelos.
+    model_path = Path(model_path or caminho_atual(ARQUIVO_MODELO))
+    input_path = Path(input_path)
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Blocos vazios (CSV só com cabeçalho) não passam pelo predict.
+    blocos = (
+        bloco for bloco in pd.read_csv(input_path, chunksize=chunksize) if len(bloco)
+    )
+    total = 0
+
+    if workers <= 1:
+        # Execução no próprio processo (sem custo de serialização dos blocos).
+        _inicializar_worker(
+            str(model_path), coluna_alvo, tamanho_cache, aluno, n_jobs=None
+        )
+        for bloco in blocos:
+            predicoes = _pontuar_bloco(bloco)
+            _gravar_bloco(bloco, predicoes, output_path, total == 0, monitor)
+            total += len(bloco)
+        if total == 0:
+            _gravar_cabecalho(input_path, output_path)
+        return total
+
+    # Limita os blocos em voo para manter a memória constante e a ordem de saída.
+    max_em_voo = workers * 2
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_inicializar_worker,
+        initargs=(str(model_path), coluna_alvo, tamanho_cache, aluno),
+    ) as pool:
+        pendentes = deque()
+        primeiro = True
+        for bloco in blocos:
+            pendentes.append((bloco, pool.submit(_pontuar_bloco, bloco)))
+            if len(pendentes) >= max_em_voo:
+                bloco_pronto, futuro = pendentes.popleft()
+                _gravar_bloco(
+                    bloco_pronto, futuro.result(), output_path, primeiro, monitor
+                )
+                primeiro = False
+                total += len(bloco_pronto)
+        while pendentes:
+            bloco_pronto, futuro = pendentes.popleft()
+            _gravar_bloco(
+                bloco_pronto, futuro.result(), output_path, primeiro, monitor
+            )
+            primeiro = False
+            total += len(bloco_pronto)
+    if total == 0:
+        _gravar_cabecalho(input_path, output_path)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True, help="CSV bruto a ser pontuado")
+    parser.add_argument("--output", required=True, help="CSV de saída com a predição")
+    parser.add_argument(
+        "--model", default=None, help="Bundle (padrão: versão ativa em models/)."
+    )
+    parser.add_argument(
+        "--target", default="Obesity", help="Nome da coluna alvo, se existir no CSV"
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=100_000,
+        help="Linhas lidas por bloco (controla a memória máxima).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processos usados na pontuação.",
+    )
+    parser.add_argument(
+        "--cache_size",
+        type=int,
+        default=0,
+        help="Entradas do cache LRU de predições por processo (0 desativa).",
+    )
+    parser.add_argument(
+        "--student",
+        action="store_true",
+        help="Usa o modelo aluno destilado salvo no bundle.",
+    )
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="Imprime o tempo por etapa (só com --workers 1).",
+    )
+    parser.add_argument(
+        "--instrument_memory",
+        action="store_true",
+        help="Com --instrument, inclui o pico de memória (tracemalloc).",
+    )
+    parser.add_argument(
+        "--drift_profile",
+        default=None,
+        help="Perfil de referência (padrão: o da versão do modelo, se existir).",
+    )
+    parser.add_argument(
+        "--drift_state",
+        default=None,
+        help=(
+            "Soma as contagens desta execução a um estado compartilhado (ex.: "
+            "models/deriva_lote.json, lido pela página de métricas). Sem ele, a "
+            "deriva vale só para esta execução."
+        ),
+    )
+    args = parser.parse_args()
+    args.model = Path(args.model or caminho_atual(ARQUIVO_MODELO))
+    args.drift_profile = Path(
+        args.drift_profile or args.model.parent / ARQUIVO_PERFIL
+    )
+
+    if not args.model.exists():
+        raise SystemExit(
+            "Modelo não encontrado. Treine primeiro com: "
+            "python -m src.obesity_tc.train --data data/raw/Obesity.csv --target Obesity"
+        )
+
+    # Nos workers do pool o medidor ficaria em outro processo.
+    medidor = None
+    if args.instrument and args.workers <= 1:
+        medidor = ativar(memoria=args.instrument_memory)
+
+    monitor = None
+    if args.drift_profile.exists():
+        monitor = MonitorDeriva.carregar_perfil(args.drift_profile)
+
+    inicio = time.perf_counter()
+    total = pontuar_csv(
+        args.input,
+        args.output,
+        model_path=args.model,
+        coluna_alvo=args.target,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        tamanho_cache=args.cache_size,
+        aluno=args.student,
+        monitor=monitor,
+    )
+    duracao = time.perf_counter() - inicio
+    print(
+        f"OK: pontuou {total} linhas em {duracao:.2f}s "
+        f"({total / max(duracao, 1e-9):,.0f} linhas/s) | saída em {args.output}"
+    )
+    if monitor is not None:
+        deriva = monitor.comparar()
+        alertas = deriva[deriva["deriva"] != "estável"]
+        resumo = ", ".join(
+            f"{r.variavel} PSI={r.psi:.3f}" for r in alertas.itertuples()
+        )
+        print(f"Deriva ({monitor.n} linhas desta execução): {resumo or 'estável'}")
+        if args.drift_state:
+            monitor.salvar_estado(args.drift_state)
+            print(f"Estado de deriva: {args.drift_state} ({monitor.n} linhas no total)")
+    if medidor:
+        medidor.imprimir()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.obesity_tc.instrumentation import etapa, prever_por_etapas
+from src.obesity_tc.make_dataset import (
+    COLUNAS_DISCRETAS_ARREDONDAR,
+    COLUNAS_ENTRADA,
+    hash_arquivo,
+    preprocessar_base,
+)
+
+# Casas decimais usadas para quantizar as medidas contínuas na chave do cache.
+PRECISAO_PADRAO = {"Age": 0, "Height": 2, "Weight": 1}
+
+
+def _ausente(valor) -> bool:
+    if isinstance(valor, str):
+        return not valor.strip()
+    return valor is None or bool(pd.isna(valor))
+
+
+class CachePredicoes:
+    """Cache LRU de predições, chaveado pela linha de entrada normalizada."""
+
+    def __init__(
+        self,
+        model_path: Path,
+        max_itens: int = 10_000,
+        precisao: dict = None,
+    ):
+        self.model_path = Path(model_path)
+        self.max_itens = max_itens
+        self.precisao = {**PRECISAO_PADRAO, **(precisao or {})}
+        self.itens = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.hash_modelo = None
+        self._assinatura = None
+        self._trava = threading.Lock()
+
+    def _verificar_modelo(self) -> None:
+        # Só recalcula o hash quando tamanho/mtime mudam; limpa se o conteúdo mudou.
+        stat = self.model_path.stat()
+        assinatura = (stat.st_mtime_ns, stat.st_size)
+        if assinatura == self._assinatura:
+            return
+        novo_hash = hash_arquivo(self.model_path)
+        if self.hash_modelo is not None and novo_hash != self.hash_modelo:
+            self.itens.clear()
+            self.invalidacoes += 1
+        self.hash_modelo = novo_hash
+        self._assinatura = assinatura
+
+    def chave(self, registro: dict) -> tuple:
+        valores = []
+        for coluna in COLUNAS_ENTRADA:
+            valor = registro[coluna]
+            if _ausente(valor):
+                # Ausentes (None/NaN/vazio) viram um único marcador na chave e
+                # chegam ao pipeline como NaN, como no caminho sem cache.
+                valor = None
+            elif coluna in COLUNAS_DISCRETAS_ARREDONDAR:
+                valor = int(round(float(valor)))
+            elif coluna in self.precisao:
+                valor = round(float(valor), self.precisao[coluna])
+            else:
+                valor = str(valor).strip()
+            valores.append(valor)
+        return tuple(valores)
+
+    def prever(self, preditor, df: pd.DataFrame) -> np.ndarray:
+        # Predição linha a linha via cache; as linhas ausentes vão em um único lote.
+        with etapa("cache.consulta"):
+            chaves = [self.chave(r) for r in df[COLUNAS_ENTRADA].to_dict("records")]
+            resultado = [None] * len(chaves)
+            faltantes = {}
+            with self._trava:
+                self._verificar_modelo()
+                for i, chave in enumerate(chaves):
+                    if chave in self.itens:
+                        self.itens.move_to_end(chave)
+                        resultado[i] = self.itens[chave]
+                        self.acertos += 1
+                    else:
+                        faltantes.setdefault(chave, []).append(i)
+                        self.falhas += 1
+
+        if faltantes:
+            # Prediz sobre a linha quantizada para que a resposta dependa só da chave.
+            lote = pd.DataFrame(list(faltantes), columns=COLUNAS_ENTRADA)
+            predicoes = prever_por_etapas(preditor, preprocessar_base(lote))
+            with self._trava:
+                for (chave, posicoes), predicao in zip(faltantes.items(), predicoes):
+                    for i in posicoes:
+                        resultado[i] = predicao
+                    self.itens[chave] = predicao
+                    self.itens.move_to_end(chave)
+                while len(self.itens) > self.max_itens:
+                    self.itens.popitem(last=False)
+        return np.asarray(resultado, dtype=object)
+
+    def limpar(self) -> None:
+        with self._trava:
+            self.itens.clear()
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.falhas
+        return {
+            "itens": len(self.itens),
+            "max_itens": self.max_itens,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "invalidacoes": self.invalidacoes,
+            "hash_modelo": self.hash_modelo,
+        }
@@ -0,0 +1,133 @@
+import cProfile
+import io
+import pstats
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+DIRETORIO_PERFIS = Path("reports/profiles")
+
+
+def revisao_git() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecida"
+
+
+def contar_linhas(caminho) -> int:
+    # Linhas de dados do CSV (sem o cabeçalho), lendo em blocos binários.
+    total = 0
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            total += bloco.count(b"\n")
+    return max(total - 1, 0)
+
+
+def _nome_quadro(quadro) -> str:
+    codigo = quadro.f_code
+    arquivo = Path(codigo.co_filename).name
+    return f"{codigo.co_name} ({arquivo}:{codigo.co_firstlineno})"
+
+
+class AmostradorPilhas:
+    """Amostra a pilha de uma thread em intervalos fixos (formato collapsed).
+
+    Cada amostra pesa o tempo decorrido desde a anterior, em múltiplos do
+    intervalo: trechos em C que seguram o GIL atrasam a amostra, mas não somem.
+    """
+
+    def __init__(self, thread_id: int, intervalo_s: float = 0.005):
+        self.thread_id = thread_id
+        self.intervalo_s = intervalo_s
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+
+    def _amostrar(self) -> None:
+        anterior = time.perf_counter()
+        while not self._parar.wait(self.intervalo_s):
+            agora = time.perf_counter()
+            quadro = sys._current_frames().get(self.thread_id)
+            nomes = []
+            while quadro is not None:
+                nomes.append(_nome_quadro(quadro))
+                quadro = quadro.f_back
+            if nomes:
+                peso = max(1, round((agora - anterior) / self.intervalo_s))
+                self.pilhas[";".join(reversed(nomes))] += peso
+            anterior = agora
+
+    def iniciar(self) -> None:
+        self._thread.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+        self._thread.join()
+
+    def salvar(self, caminho: Path) -> None:
+        # Uma linha por pilha: "raiz;...;folha contagem" (flamegraph.pl, speedscope).
+        linhas = [f"{pilha} {n}" for pilha, n in self.pilhas.most_common()]
+        caminho.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+
+
+@contextmanager
+def perfilar(
+    programa: str,
+    entrada=None,
+    ativo: bool = True,
+    diretorio: Path = DIRETORIO_PERFIS,
+    intervalo_s: float = 0.005,
+):
+    """Perfila o bloco com cProfile (árvore de chamadas) e amostragem de pilhas.
+
+    Grava em `diretorio` os arquivos <programa>_<linhas>l_<revisão>_<horário>
+    .prof (pstats), .txt (estatísticas legíveis) e .collapsed (flamegraph).
+    """
+    if not ativo:
+        yield None
+        return
+
+    n_linhas = contar_linhas(entrada) if entrada and Path(entrada).is_file() else 0
+    revisao = revisao_git()
+    horario = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    base = diretorio / f"{programa}_{n_linhas}l_{revisao}_{horario}"
+
+    amostrador = AmostradorPilhas(threading.get_ident(), intervalo_s)
+    perfil = cProfile.Profile()
+    inicio = time.perf_counter()
+    amostrador.iniciar()
+    perfil.enable()
+    try:
+        yield base
+    finally:
+        perfil.disable()
+        amostrador.parar()
+        duracao = time.perf_counter() - inicio
+
+        perfil.dump_stats(base.with_suffix(".prof"))
+        amostrador.salvar(base.with_suffix(".collapsed"))
+        texto = io.StringIO()
+        texto.write(
+            f"programa: {programa}\nentrada: {entrada} ({n_linhas} linhas)\n"
+            f"revisao: {revisao}\nargv: {' '.join(sys.argv)}\n"
+            f"duracao: {duracao:.2f}s\n\n"
+        )
+        estatisticas = pstats.Stats(perfil, stream=texto).strip_dirs()
+        estatisticas.sort_stats("tottime").print_stats(30)
+        estatisticas.sort_stats("cumulative").print_stats(60)
+        estatisticas.print_callees(30)
+        base.with_suffix(".txt").write_text(texto.getvalue(), encoding="utf-8")
+        print(f"Perfil: {base}.{{prof,txt,collapsed}} ({duracao:.1f}s)")
@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from joblib import load
+
+# Artefatos de uma versão; o layout antigo (tudo solto em models/) usa os mesmos nomes.
+ARQUIVO_MODELO = "modelo_obesidade.joblib"
+ARQUIVO_FLORESTA = "modelo_obesidade_floresta.npz"
+DIRETORIO_MMAP = "modelo_obesidade_mmap"
+ARQUIVO_PERFIL = "perfil_referencia.json"
+ARQUIVO_METRICAS = "metrics.json"
+
+RAIZ_MODELOS = Path("models")
+# models/versoes/<versão>/ guarda os artefatos; models/ATUAL.json aponta a ativa.
+PONTEIRO = "ATUAL.json"
+VERSOES = "versoes"
+
+
+def ler_ponteiro(raiz: Path = RAIZ_MODELOS):
+    caminho = Path(raiz) / PONTEIRO
+    try:
+        return json.loads(caminho.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def diretorio_atual(raiz: Path = RAIZ_MODELOS) -> Path:
+    # Sem ponteiro, cai no layout antigo (artefatos direto em models/).
+    ponteiro = ler_ponteiro(raiz)
+    if ponteiro is None:
+        return Path(raiz)
+    return Path(raiz) / VERSOES / ponteiro["versao"]
+
+
+def caminho_atual(nome: str, raiz: Path = RAIZ_MODELOS) -> Path:
+    return diretorio_atual(raiz) / nome
+
+
+def nova_versao(raiz: Path = RAIZ_MODELOS) -> Path:
+    # Diretório novo a cada treino: nada que um leitor esteja usando é reescrito.
+    versao = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    diretorio = Path(raiz) / VERSOES / versao
+    diretorio.mkdir(parents=True, exist_ok=False)
+    return diretorio
+
+
+def _gravar_json_atomico(caminho: Path, conteudo: dict) -> None:
+    temporario = caminho.with_name(f".{caminho.name}.{os.getpid()}.tmp")
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(conteudo, arquivo, indent=2, ensure_ascii=False)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+
+
+def publicar(diretorio_versao: Path, raiz: Path = RAIZ_MODELOS, **metadados) -> dict:
+    """Valida a versão (o bundle precisa carregar) e troca o ponteiro atomicamente."""
+    diretorio_versao = Path(diretorio_versao)
+    inicio = time.perf_counter()
+    load(diretorio_versao / ARQUIVO_MODELO)
+    tempo_carga_ms = (time.perf_counter() - inicio) * 1000
+
+    caminho_metricas = diretorio_versao / ARQUIVO_METRICAS
+    acuracia = None
+    if caminho_metricas.exists():
+        acuracia = json.loads(caminho_metricas.read_text(encoding="utf-8"))["acuracia"]
+    ponteiro = {
+        "versao": diretorio_versao.name,
+        "acuracia": acuracia,
+        **metadados,
+        "tempo_carga_ms": tempo_carga_ms,
+        "publicado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    # Cópia dentro da versão: permite voltar a ela sem perder os metadados.
+    _gravar_json_atomico(diretorio_versao / "versao.json", ponteiro)
+    _gravar_json_atomico(Path(raiz) / PONTEIRO, ponteiro)
+    return ponteiro
+
+
+def listar_versoes(raiz: Path = RAIZ_MODELOS) -> list:
+    versoes = []
+    for diretorio in sorted((Path(raiz) / VERSOES).glob("*")):
+        caminho = diretorio / "versao.json"
+        if caminho.exists():
+            versoes.append(json.loads(caminho.read_text(encoding="utf-8")))
+    return versoes
+
+
+def ativar_versao(versao: str, raiz: Path = RAIZ_MODELOS) -> dict:
+    # Rollback: aponta de novo para uma versão já publicada.
+    caminho = Path(raiz) / VERSOES / versao / "versao.json"
+    if not caminho.exists():
+        raise SystemExit(f"Versão {versao} não encontrada ou nunca publicada.")
+    ponteiro = {
+        **json.loads(caminho.read_text(encoding="utf-8")),
+        "publicado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    _gravar_json_atomico(Path(raiz) / PONTEIRO, ponteiro)
+    return ponteiro
+
+
+def descartar_antigas(raiz: Path = RAIZ_MODELOS, manter: int = 5) -> list:
+    # Remove as versões mais antigas, nunca a atual. Processos que ainda mapeiam
+    # os .npy de uma versão removida continuam lendo (o Linux só libera no fim).
+    ponteiro = ler_ponteiro(raiz) or {}
+    diretorios = sorted(p for p in (Path(raiz) / VERSOES).glob("*") if p.is_dir())
+    removidas = []
+    for diretorio in diretorios[: max(len(diretorios) - manter, 0)]:
+        if diretorio.name != ponteiro.get("versao"):
+            shutil.rmtree(diretorio, ignore_errors=True)
+            removidas.append(diretorio.name)
+    return removidas
+
+
+class CarregadorModelo:
+    """Mantém a versão atual carregada e troca por uma nova em segundo plano.
+
+    A troca é uma única atribuição de referência: predições em andamento
+    terminam com o modelo que já tinham em mãos, sem trava no caminho de leitura.
+    """
+
+    def __init__(self, carregar, raiz: Path = RAIZ_MODELOS, intervalo_s: float = 2.0):
+        # carregar(diretorio_da_versao) -> objeto usado nas predições.
+        self.carregar = carregar
+        self.raiz = Path(raiz)
+        self.intervalo_s = intervalo_s
+        self.recargas = 0
+        self.ultimo_erro = None
+        self._atual = None
+        self._trava = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _assinatura(self):
+        ponteiro = self.raiz / PONTEIRO
+        caminho = ponteiro if ponteiro.exists() else self.raiz / ARQUIVO_MODELO
+        if not caminho.exists():
+            return None
+        stat = caminho.stat()
+        return (str(caminho), stat.st_mtime_ns, stat.st_size)
+
+    def verificar(self) -> bool:
+        # True quando uma nova versão foi carregada. Sem nenhum modelo em disco,
+        # a primeira carga deixa o erro de `carregar` subir; depois, segue a atual.
+        assinatura = self._assinatura()
+        if self._atual is not None and assinatura in (None, self._atual["assinatura"]):
+            return False
+        with self._trava:
+            if self._atual is not None and self._atual["assinatura"] == assinatura:
+                return False
+            diretorio = diretorio_atual(self.raiz)
+            inicio = time.perf_counter()
+            modelo = self.carregar(diretorio)
+            metadados = {
+                **(ler_ponteiro(self.raiz) or {"versao": "legado"}),
+                "diretorio": str(diretorio),
+                "carregado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "tempo_carga_local_ms": (time.perf_counter() - inicio) * 1000,
+            }
+            self._atual = {
+                "assinatura": assinatura,
+                "metadados": metadados,
+                "modelo": modelo,
+            }
+            self.recargas += 1
+            return True
+
+    def atual(self) -> dict:
+        # {"metadados", "modelo"}; a primeira chamada carrega de forma síncrona.
+        if self._atual is None:
+            self.verificar()
+        return self._atual
+
+    def _monitorar(self) -> None:
+        while not self._parar.wait(self.intervalo_s):
+            try:
+                self.verificar()
+                self.ultimo_erro = None
+            except Exception as exc:  # mantém a versão anterior servindo
+                self.ultimo_erro = f"{type(exc).__name__}: {exc}"
+
+    def iniciar(self) -> "CarregadorModelo":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._monitorar, daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self) -> None:
+        self._parar.set()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models_dir", default=str(RAIZ_MODELOS))
+    parser.add_argument(
+        "--activate", default=None, help="Versão a ativar (rollback para uma anterior)."
+    )
+    args = parser.parse_args()
+
+    if args.activate:
+        ponteiro = ativar_versao(args.activate, args.models_dir)
+        print(f"OK: versão {ponteiro['versao']} ativa.")
+        return
+    atual = (ler_ponteiro(args.models_dir) or {}).get("versao")
+    for versao in listar_versoes(args.models_dir):
+        marca = "*" if versao["versao"] == atual else " "
+        acuracia = versao.get("acuracia")
+        acuracia = "-" if acuracia is None else f"{acuracia:.4f}"
+        print(
+            f"{marca} {versao['versao']} | acurácia {acuracia} | dados "
+            f"{str(versao.get('hash_dados'))[:12]} | publicado {versao['publicado_em']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
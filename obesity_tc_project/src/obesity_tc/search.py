@@ -0,0 +1,209 @@
+import itertools
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from imblearn.over_sampling import SMOTE
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+
+from src.obesity_tc.stage_cache import ajustar_pipeline
+
+# Espaço de busca: tamanho da floresta, profundidade, max_features e k do SMOTE.
+ESPACO_BUSCA = {
+    "n_estimators": [100, 200, 500],
+    "max_depth": [None, 10, 20],
+    "max_features": ["sqrt", "log2", 0.5],
+    "k_neighbors": [3, 5, 7],
+}
+
+# Dados pré-processados compartilhados por cada processo do pool.
+_DADOS = None
+
+
+def gerar_candidatos(modo: str = "grid", n_iter: int = 20, random_state: int = 42):
+    chaves = list(ESPACO_BUSCA)
+    grade = [
+        dict(zip(chaves, valores))
+        for valores in itertools.product(*ESPACO_BUSCA.values())
+    ]
+    if modo == "random" and n_iter < len(grade):
+        return random.Random(random_state).sample(grade, n_iter)
+    return grade
+
+
+def _inicializar_worker(dados: dict) -> None:
+    global _DADOS
+    _DADOS = dados
+
+
+def avaliar_candidato(parametros: dict) -> dict:
+    matriz_teste = _DADOS["matriz_teste"]
+    random_state = _DADOS["random_state"]
+
+    # A base balanceada depende só de k_neighbors: vem pronta de executar_busca.
+    matriz_balanceada, alvo_balanceado, tempo_smote = _DADOS["balanceadas"][
+        parametros["k_neighbors"]
+    ]
+    inicio = time.perf_counter()
+    modelo = RandomForestClassifier(
+        n_estimators=parametros["n_estimators"],
+        max_depth=parametros["max_depth"],
+        max_features=parametros["max_features"],
+        random_state=random_state,
+        n_jobs=1,
+    )
+    modelo.fit(matriz_balanceada, alvo_balanceado)
+    tempo_fit = time.perf_counter() - inicio
+
+    predicoes = modelo.predict(matriz_teste)
+
+    # Latência de uma linha (mediana), como no uso do app.
+    linha = matriz_teste[:1]
+    tempos = []
+    for _ in range(10):
+        inicio = time.perf_counter()
+        modelo.predict(linha)
+        tempos.append(time.perf_counter() - inicio)
+
+    return {
+        **parametros,
+        "parametros": ", ".join(f"{c}={v}" for c, v in parametros.items()),
+        "acuracia": float(accuracy_score(_DADOS["alvo_teste"], predicoes)),
+        "tempo_fit_s": tempo_fit,
+        "tempo_smote_s": tempo_smote,
+        "latencia_predict_ms": float(np.median(tempos) * 1000),
+    }
+
+
+def executar_busca(
+    entradas_treino,
+    alvo_treino,
+    entradas_teste,
+    alvo_teste,
+    preprocessador,
+    modo: str = "grid",
+    n_iter: int = 20,
+    workers: int = 1,
+    random_state: int = 42,
+    output_path: Path = Path("reports/search_leaderboard.csv"),
+) -> pd.DataFrame:
+    # O ColumnTransformer é ajustado uma única vez; os candidatos reutilizam a saída.
+    preprocessador = clone(preprocessador)
+    matriz_treino = preprocessador.fit_transform(entradas_treino)
+    alvo_treino = np.asarray(alvo_treino)
+    candidatos = gerar_candidatos(modo, n_iter, random_state)
+
+    # SMOTE uma vez por k_neighbors (com o mesmo random_state a saída é idêntica
+    # entre candidatos); o tempo fica registrado junto de cada candidato.
+    balanceadas = {}
+    for k in sorted({c["k_neighbors"] for c in candidatos}):
+        inicio = time.perf_counter()
+        smote = SMOTE(random_state=random_state, k_neighbors=k)
+        matriz_balanceada, alvo_balanceado = smote.fit_resample(
+            matriz_treino, alvo_treino
+        )
+        balanceadas[k] = (
+            matriz_balanceada,
+            alvo_balanceado,
+            time.perf_counter() - inicio,
+        )
+    dados = {
+        "balanceadas": balanceadas,
+        "matriz_teste": preprocessador.transform(entradas_teste),
+        "alvo_teste": np.asarray(alvo_teste),
+        "random_state": random_state,
+    }
+
+    if workers <= 1:
+        _inicializar_worker(dados)
+        resultados = [avaliar_candidato(c) for c in candidatos]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_inicializar_worker,
+            initargs=(dados,),
+        ) as pool:
+            resultados = list(pool.map(avaliar_candidato, candidatos))
+
+    # Ranking: maior acurácia primeiro; empate resolvido pela menor latência.
+    ranking = pd.DataFrame(resultados).sort_values(
+        ["acuracia", "latencia_predict_ms", "tempo_fit_s"],
+        ascending=[False, True, True],
+    )
+    ranking.insert(0, "posicao", range(1, len(ranking) + 1))
+    ranking["max_depth"] = ranking["max_depth"].astype("Int64")
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    ranking.to_csv(output_path, index=False, encoding="utf-8")
+    return ranking.reset_index(drop=True)
+
+
+# Varredura acurácia x latência sobre tamanho e profundidade da floresta.
+TAMANHOS_VARREDURA = [10, 25, 50, 100, 200, 300, 500]
+PROFUNDIDADES_VARREDURA = [None, 16, 12, 8]
+
+
+def _latencia_linha_ms(pipeline, linha: pd.DataFrame, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        pipeline.predict(linha)
+        tempos.append(time.perf_counter() - inicio)
+    return float(np.median(tempos) * 1000)
+
+
+def varrer_tamanho_floresta(
+    pipeline,
+    entradas_treino,
+    alvo_treino,
+    entradas_teste,
+    alvo_teste,
+    tamanhos=TAMANHOS_VARREDURA,
+    profundidades=PROFUNDIDADES_VARREDURA,
+    repeticoes: int = 20,
+    cache=None,
+) -> list:
+    # Uma floresta do maior tamanho por profundidade: as árvores são sorteadas em
+    # sequência a partir do random_state, então as k primeiras são exatamente a
+    # floresta com n_estimators=k.
+    tamanhos = sorted(tamanhos)
+    linha = entradas_teste.head(1)
+    curva = []
+    for max_depth in profundidades:
+        pipe = clone(pipeline).set_params(
+            model__n_estimators=tamanhos[-1], model__max_depth=max_depth
+        )
+        ajustar_pipeline(pipe, entradas_treino, alvo_treino, cache)
+        modelo = pipe.named_steps["model"]
+        arvores = modelo.estimators_
+        for n_arvores in tamanhos:
+            modelo.estimators_ = arvores[:n_arvores]
+            modelo.n_estimators = n_arvores
+            predicoes = pipe.predict(entradas_teste)
+            curva.append(
+                {
+                    "n_estimators": n_arvores,
+                    "max_depth": max_depth,
+                    "acuracia": float(accuracy_score(alvo_teste, predicoes)),
+                    "latencia_predict_ms": _latencia_linha_ms(pipe, linha, repeticoes),
+                    "n_nos": int(sum(a.tree_.node_count for a in modelo.estimators_)),
+                }
+            )
+    return curva
+
+
+def escolher_menor_modelo(curva: list, max_predict_ms: float, min_accuracy: float):
+    # Menor floresta (em nós) que cumpre latência e acurácia; None se nenhuma cumprir.
+    aprovados = [
+        ponto
+        for ponto in curva
+        if ponto["latencia_predict_ms"] <= max_predict_ms
+        and ponto["acuracia"] >= min_accuracy
+    ]
+    return min(aprovados, key=lambda p: (p["n_nos"], -p["acuracia"]), default=None)
@@ -0,0 +1,368 @@
+import argparse
+import asyncio
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from joblib import load
+
+from src.obesity_tc.compact_forest import FlorestaCompacta
+from src.obesity_tc.drift import MonitorDeriva
+from src.obesity_tc.make_dataset import (
+    COLUNAS_DISCRETAS_ARREDONDAR,
+    COLUNAS_ENTRADA,
+    COLUNAS_FLOAT32,
+    preprocessar_base,
+)
+from src.obesity_tc.registry import (
+    ARQUIVO_FLORESTA,
+    ARQUIVO_MODELO,
+    ARQUIVO_PERFIL,
+    caminho_atual,
+)
+
+STATUS_HTTP = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+# Campos numéricos da entrada; os demais são categóricos (texto).
+CAMPOS_NUMERICOS = [
+    c for c in COLUNAS_ENTRADA if c in COLUNAS_FLOAT32 + COLUNAS_DISCRETAS_ARREDONDAR
+]
+
+
+def carregar_preditor(model_path: Path, forest_path: Path = None, aluno: bool = False):
+    # Prefere a floresta compacta (mesmos rótulos) quando exportada com o modelo.
+    model_path = Path(model_path)
+    if aluno:
+        pacote = load(model_path)
+        if "aluno" not in pacote:
+            raise SystemExit(
+                "O bundle não tem modelo aluno; treine com --student arvore|hgb."
+            )
+        pipeline = pacote["aluno"]["pipeline"]
+        # A árvore destilada também roda no preditor vetorizado.
+        if pacote["aluno"]["tipo"] == "arvore":
+            return FlorestaCompacta.do_pipeline(pipeline)
+        return pipeline
+    if (
+        forest_path
+        and Path(forest_path).exists()
+        and Path(forest_path).stat().st_mtime >= model_path.stat().st_mtime
+    ):
+        return FlorestaCompacta.carregar(forest_path)
+    pipeline = load(model_path)["pipeline"]
+    # As chamadas já chegam agrupadas; threads extras só disputam o núcleo.
+    pipeline.named_steps["model"].n_jobs = 1
+    return pipeline
+
+
+class MicroLote:
+    """Agrupa requisições concorrentes em uma única chamada vetorizada de predict."""
+
+    def __init__(
+        self,
+        preditor,
+        max_espera_ms: float = 2.0,
+        max_linhas: int = 64,
+        monitor: MonitorDeriva = None,
+    ):
+        self.preditor = preditor
+        self.monitor = monitor
+        self.max_espera = max_espera_ms / 1000
+        self.max_linhas = max_linhas
+        self.fila = asyncio.Queue()
+        self.linhas_na_fila = 0
+        self.lotes = 0
+        self.linhas_processadas = 0
+        self.maior_lote = 0
+        self.tempo_predict = 0.0
+        # Uma única thread serializa os lotes sem bloquear o event loop.
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def prever(self, registros: list) -> list:
+        futuro = asyncio.get_running_loop().create_future()
+        self.linhas_na_fila += len(registros)
+        await self.fila.put((registros, futuro))
+        return await futuro
+
+    async def executar(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pendentes = [await self.fila.get()]
+            n_linhas = len(pendentes[0][0])
+            limite = loop.time() + self.max_espera
+            # Junta o que chegar dentro da janela ou até encher o lote.
+            while n_linhas < self.max_linhas:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.fila.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                pendentes.append(item)
+                n_linhas += len(item[0])
+
+            registros = [r for itens, _ in pendentes for r in itens]
+            self.linhas_na_fila -= len(registros)
+            try:
+                predicoes = await loop.run_in_executor(
+                    self.executor, self._prever_lote, registros
+                )
+            except Exception:
+                # Uma requisição ruim não derruba o lote: refaz uma a uma e só
+                # as que falharem de novo recebem o erro.
+                for itens, futuro in pendentes:
+                    try:
+                        resultado = await loop.run_in_executor(
+                            self.executor, self._prever_lote, itens
+                        )
+                    except Exception as exc:
+                        if not futuro.done():
+                            futuro.set_exception(exc)
+                    else:
+                        if not futuro.done():
+                            futuro.set_result(resultado)
+                continue
+
+            inicio = 0
+            for itens, futuro in pendentes:
+                if not futuro.done():
+                    futuro.set_result(predicoes[inicio : inicio + len(itens)])
+                inicio += len(itens)
+
+    def _prever_lote(self, registros: list) -> list:
+        inicio = time.perf_counter()
+        df = preprocessar_base(pd.DataFrame(registros, columns=COLUNAS_ENTRADA))
+        predicoes = [str(p) for p in self.preditor.predict(df)]
+        if self.monitor is not None:
+            self.monitor.atualizar(df, predicoes)
+        self.tempo_predict += time.perf_counter() - inicio
+        self.lotes += 1
+        self.linhas_processadas += len(registros)
+        self.maior_lote = max(self.maior_lote, len(registros))
+        return predicoes
+
+    def estatisticas(self) -> dict:
+        return {
+            "fila_requisicoes": self.fila.qsize(),
+            "fila_linhas": self.linhas_na_fila,
+            "lotes": self.lotes,
+            "linhas_processadas": self.linhas_processadas,
+            "tamanho_medio_lote": (
+                self.linhas_processadas / self.lotes if self.lotes else 0.0
+            ),
+            "maior_lote": self.maior_lote,
+            "tempo_medio_lote_ms": (
+                self.tempo_predict / self.lotes * 1000 if self.lotes else 0.0
+            ),
+            "janela_ms": self.max_espera * 1000,
+            "max_linhas": self.max_linhas,
+            "deriva": (
+                self.monitor.comparar().to_dict("records") if self.monitor else None
+            ),
+        }
+
+
+def validar_registros(corpo) -> list:
+    # Aceita um registro único ou uma lista de registros.
+    registros = corpo if isinstance(corpo, list) else [corpo]
+    if not registros:
+        raise ValueError("Nenhum registro recebido.")
+    for registro in registros:
+        if not isinstance(registro, dict):
+            raise ValueError("Cada registro deve ser um objeto JSON.")
+        faltando = [c for c in COLUNAS_ENTRADA if c not in registro]
+        if faltando:
+            raise ValueError(f"Campos ausentes: {', '.join(faltando)}")
+    # Converte os numéricos aqui: um valor inválido vira 400 só desta requisição,
+    # em vez de falhar o predict do micro-lote inteiro.
+    validados = []
+    for registro in registros:
+        registro = dict(registro)
+        for campo in CAMPOS_NUMERICOS:
+            valor = registro[campo]
+            try:
+                if isinstance(valor, bool):
+                    raise TypeError
+                registro[campo] = float(valor)
+            except (TypeError, ValueError):
+                raise ValueError(
+                    f"Campo {campo} deve ser numérico: {valor!r}"
+                ) from None
+            if not math.isfinite(registro[campo]):
+                raise ValueError(f"Campo {campo} deve ser finito: {valor!r}")
+        for campo in COLUNAS_ENTRADA:
+            if campo not in CAMPOS_NUMERICOS and not isinstance(registro[campo], str):
+                raise ValueError(f"Campo {campo} deve ser texto: {registro[campo]!r}")
+        validados.append(registro)
+    return validados
+
+
+async def _responder(writer, status: int, payload: dict, manter: bool) -> None:
+    corpo = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    cabecalho = (
+        f"HTTP/1.1 {status} {STATUS_HTTP[status]}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(corpo)}\r\n"
+        f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n"
+    )
+    writer.write(cabecalho.encode("latin-1") + corpo)
+    await writer.drain()
+
+
+async def atender_conexao(lote: MicroLote, reader, writer) -> None:
+    # Servidor HTTP/1.1 mínimo com keep-alive; suficiente para uso local.
+    try:
+        while True:
+            linha_inicial = await reader.readline()
+            if not linha_inicial:
+                break
+            try:
+                metodo, caminho, _ = linha_inicial.decode("latin-1").split(" ", 2)
+                cabecalhos = {}
+                while True:
+                    linha = await reader.readline()
+                    if linha in (b"\r\n", b"\n", b""):
+                        break
+                    chave, _, valor = linha.decode("latin-1").partition(":")
+                    cabecalhos[chave.strip().lower()] = valor.strip()
+                tamanho = int(cabecalhos.get("content-length", 0))
+            except ValueError:
+                # Requisição malformada: responde antes de fechar a conexão.
+                await _responder(writer, 400, {"erro": "Requisição inválida."}, False)
+                break
+            corpo = await reader.readexactly(tamanho) if tamanho else b""
+            manter = cabecalhos.get("connection", "").lower() != "close"
+
+            if caminho == "/stats":
+                await _responder(writer, 200, lote.estatisticas(), manter)
+            elif caminho == "/health":
+                await _responder(writer, 200, {"status": "ok"}, manter)
+            elif caminho != "/predict":
+                await _responder(writer, 404, {"erro": "Rota não encontrada."}, manter)
+            elif metodo != "POST":
+                await _responder(writer, 405, {"erro": "Use POST."}, manter)
+            else:
+                try:
+                    registros = validar_registros(json.loads(corpo or b"null"))
+                except ValueError as exc:
+                    await _responder(writer, 400, {"erro": str(exc)}, manter)
+                else:
+                    try:
+                        predicoes = await lote.prever(registros)
+                    except Exception as exc:
+                        erro = f"Falha na predição: {type(exc).__name__}: {exc}"
+                        await _responder(writer, 500, {"erro": erro}, manter)
+                    else:
+                        await _responder(writer, 200, {"predicoes": predicoes}, manter)
+            if not manter:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def servir(
+    host: str,
+    port: int,
+    preditor,
+    max_espera_ms: float,
+    max_linhas: int,
+    monitor: MonitorDeriva = None,
+    estado_deriva: Path = None,
+) -> None:
+    lote = MicroLote(
+        preditor, max_espera_ms=max_espera_ms, max_linhas=max_linhas, monitor=monitor
+    )
+    tarefa_lote = asyncio.create_task(lote.executar())
+    servidor = await asyncio.start_server(
+        lambda r, w: atender_conexao(lote, r, w), host, port
+    )
+    print(f"OK: servindo em http://{host}:{port} (POST /predict, GET /stats)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        tarefa_lote.cancel()
+        if monitor is not None and estado_deriva:
+            monitor.salvar_estado(estado_deriva)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--model", default=None, help="Bundle (padrão: versão ativa em models/)."
+    )
+    parser.add_argument(
+        "--forest", default=None, help="Floresta .npz (padrão: ao lado do bundle)."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--max_wait_ms",
+        type=float,
+        default=2.0,
+        help="Janela máxima de espera para formar um lote.",
+    )
+    parser.add_argument(
+        "--max_batch", type=int, default=64, help="Máximo de linhas por lote."
+    )
+    parser.add_argument(
+        "--student",
+        action="store_true",
+        help="Serve o modelo aluno destilado salvo no bundle.",
+    )
+    parser.add_argument(
+        "--drift_profile",
+        default=None,
+        help="Perfil de referência (padrão: o da versão do modelo, se existir).",
+    )
+    parser.add_argument(
+        "--drift_state",
+        default="models/deriva_api.json",
+        help="Contagens de deriva, retomadas e somadas ao arquivo ao encerrar.",
+    )
+    args = parser.parse_args()
+    args.model = Path(args.model or caminho_atual(ARQUIVO_MODELO))
+    args.forest = args.forest or args.model.parent / ARQUIVO_FLORESTA
+    args.drift_profile = Path(
+        args.drift_profile or args.model.parent / ARQUIVO_PERFIL
+    )
+
+    if not args.model.exists():
+        raise SystemExit(
+            "Modelo não encontrado. Treine primeiro com: "
+            "python -m src.obesity_tc.train --data data/raw/Obesity.csv --target Obesity"
+        )
+    preditor = carregar_preditor(args.model, args.forest, aluno=args.student)
+    monitor = None
+    if args.drift_profile.exists():
+        monitor = MonitorDeriva.carregar_perfil(args.drift_profile)
+        monitor.carregar_estado(args.drift_state)
+    try:
+        asyncio.run(
+            servir(
+                args.host,
+                args.port,
+                preditor,
+                args.max_wait_ms,
+                args.max_batch,
+                monitor,
+                args.drift_state,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import hashlib
+import os
+from collections import defaultdict
+from pathlib import Path
+
+import joblib
+from sklearn.base import clone
+
+from src.obesity_tc.instrumentation import etapa
+
+
+class CacheEtapas:
+    """Cache em disco das saídas de cada etapa do treino, endereçado pelo conteúdo.
+
+    A chave de uma etapa combina o hash da sua entrada com os parâmetros da
+    etapa; o diretório é limitado em tamanho, descartando os itens usados há
+    mais tempo (mtime atualizado a cada acerto).
+    """
+
+    def __init__(self, diretorio: Path, max_mb: float = 1024, verbose: bool = True):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 2**20)
+        self.verbose = verbose
+        self.contagens = defaultdict(lambda: {"acertos": 0, "falhas": 0})
+
+    @staticmethod
+    def chave(*partes) -> str:
+        # joblib.hash é determinístico para DataFrames, arrays e dicts de parâmetros.
+        return hashlib.sha256(
+            "|".join(joblib.hash(p) for p in partes).encode("utf-8")
+        ).hexdigest()[:24]
+
+    def registrar(self, etapa: str, acerto: bool) -> None:
+        self.contagens[etapa]["acertos" if acerto else "falhas"] += 1
+        if self.verbose:
+            print(f"cache [{etapa}]: {'acerto' if acerto else 'falha'}")
+
+    def obter(self, etapa: str, chave: str, calcular):
+        caminho = self.diretorio / f"{etapa}_{chave}.joblib"
+        if caminho.exists():
+            try:
+                valor = joblib.load(caminho)
+            except (EOFError, OSError, ValueError):
+                caminho.unlink(missing_ok=True)
+            else:
+                os.utime(caminho)
+                self.registrar(etapa, True)
+                return valor
+
+        valor = calcular()
+        temporario = caminho.with_suffix(f".{os.getpid()}.tmp")
+        joblib.dump(valor, temporario)
+        os.replace(temporario, caminho)
+        self.registrar(etapa, False)
+        self._descartar_antigos()
+        return valor
+
+    def _descartar_antigos(self) -> None:
+        # LRU por mtime até caber no limite de tamanho.
+        arquivos = sorted(
+            (p.stat().st_mtime, p.stat().st_size, p)
+            for p in self.diretorio.glob("*.joblib")
+        )
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in arquivos:
+            if total <= self.max_bytes:
+                break
+            caminho.unlink(missing_ok=True)
+            total -= tamanho
+
+    def resumo(self) -> dict:
+        return {etapa: dict(valores) for etapa, valores in self.contagens.items()}
+
+
+def ajustar_pipeline(pipe, entradas, alvo, cache: CacheEtapas = None):
+    # Equivale a pipe.fit(entradas, alvo) etapa por etapa (medidas pela
+    # instrumentação). Com cache, reaproveita a saída do ColumnTransformer e a
+    # reamostragem do SMOTE; só o modelo é sempre ajustado.
+    preprocessador = pipe.named_steps["preprocess"]
+    smote = pipe.named_steps["smote"]
+
+    def ajustar_preprocessador():
+        with etapa("preprocess.fit_transform"):
+            ajustado = clone(preprocessador)
+            return ajustado, ajustado.fit_transform(entradas)
+
+    def reamostrar():
+        with etapa("smote.fit_resample"):
+            return clone(smote).fit_resample(matriz, alvo)
+
+    if cache is None:
+        preprocessador, matriz = ajustar_preprocessador()
+        matriz, alvo_balanceado = reamostrar()
+    else:
+        # clone() descarta o estado ajustado: a chave depende só dos parâmetros.
+        chave_pre = cache.chave("preprocess", entradas, alvo, clone(preprocessador))
+        preprocessador, matriz = cache.obter(
+            "preprocess", chave_pre, ajustar_preprocessador
+        )
+        chave_smote = cache.chave("smote", chave_pre, clone(smote))
+        matriz, alvo_balanceado = cache.obter("smote", chave_smote, reamostrar)
+
+    pipe.steps[0] = ("preprocess", preprocessador)
+    with etapa("model.fit"):
+        pipe.named_steps["model"].fit(matriz, alvo_balanceado)
+    return pipe
@@ -0,0 +1,164 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.obesity_tc.make_dataset import COLUNAS_DISCRETAS_ARREDONDAR, COLUNAS_ENTRADA
+
+# Medidas contínuas geradas em conjunto (normal multivariada por classe).
+COLUNAS_CONTINUAS = ["Age", "Height", "Weight"]
+
+
+def ajustar_perfil(df: pd.DataFrame, coluna_alvo: str = "Obesity") -> dict:
+    # Aprende distribuições condicionais por classe a partir da base bruta.
+    df = df.copy()
+    for coluna in df.columns:
+        if df[coluna].dtype == "object":
+            df[coluna] = df[coluna].astype(str).str.strip()
+
+    colunas_categoricas = [
+        c
+        for c in COLUNAS_ENTRADA
+        if c not in COLUNAS_CONTINUAS and c not in COLUNAS_DISCRETAS_ARREDONDAR
+    ]
+    proporcoes = df[coluna_alvo].value_counts(normalize=True)
+    perfil = {
+        "coluna_alvo": coluna_alvo,
+        "colunas": COLUNAS_ENTRADA + [coluna_alvo],
+        "classes": proporcoes.index.tolist(),
+        "proporcoes": proporcoes.tolist(),
+        "por_classe": {},
+    }
+    for classe, grupo in df.groupby(coluna_alvo):
+        continuas = grupo[COLUNAS_CONTINUAS].to_numpy(dtype=np.float64)
+        # Covariância regularizada para classes pequenas/degeneradas.
+        covariancia = np.cov(continuas, rowvar=False)
+        covariancia += np.eye(len(COLUNAS_CONTINUAS)) * 1e-6
+        perfil["por_classe"][classe] = {
+            "media": continuas.mean(axis=0).tolist(),
+            "covariancia": covariancia.tolist(),
+            "minimo": continuas.min(axis=0).tolist(),
+            "maximo": continuas.max(axis=0).tolist(),
+            # Escores discretos guardam o histograma arredondado (sem valores brutos).
+            "discretas": {
+                c: grupo[c].round(0).value_counts(normalize=True).sort_index().to_dict()
+                for c in COLUNAS_DISCRETAS_ARREDONDAR
+            },
+            "categoricas": {
+                c: grupo[c].value_counts(normalize=True).to_dict()
+                for c in colunas_categoricas
+            },
+        }
+    return perfil
+
+
+def _amostrar_categorias(rng, frequencias: dict, n: int) -> np.ndarray:
+    valores = list(frequencias)
+    pesos = np.asarray(list(frequencias.values()), dtype=np.float64)
+    return np.asarray(valores)[rng.choice(len(valores), size=n, p=pesos / pesos.sum())]
+
+
+def gerar_linhas(perfil: dict, n_linhas: int, rng: np.random.Generator) -> pd.DataFrame:
+    # Sorteia a classe de cada linha e gera os atributos condicionados à classe.
+    classes = np.asarray(perfil["classes"])
+    pesos = np.asarray(perfil["proporcoes"])
+    sorteio = rng.choice(len(classes), size=n_linhas, p=pesos / pesos.sum())
+    colunas = {c: np.empty(n_linhas, dtype=object) for c in perfil["colunas"]}
+    for c in COLUNAS_CONTINUAS + COLUNAS_DISCRETAS_ARREDONDAR:
+        colunas[c] = np.empty(n_linhas, dtype=np.float64)
+
+    for indice, classe in enumerate(classes):
+        posicoes = np.flatnonzero(sorteio == indice)
+        if posicoes.size == 0:
+            continue
+        dist = perfil["por_classe"][classe]
+        continuas = rng.multivariate_normal(
+            dist["media"], dist["covariancia"], size=posicoes.size
+        )
+        continuas = np.clip(continuas, dist["minimo"], dist["maximo"])
+        for j, coluna in enumerate(COLUNAS_CONTINUAS):
+            colunas[coluna][posicoes] = continuas[:, j]
+        for coluna, frequencias in dist["discretas"].items():
+            valores = _amostrar_categorias(rng, frequencias, posicoes.size)
+            colunas[coluna][posicoes] = valores.astype(np.float64)
+        for coluna, frequencias in dist["categoricas"].items():
+            colunas[coluna][posicoes] = _amostrar_categorias(
+                rng, frequencias, posicoes.size
+            )
+        colunas[perfil["coluna_alvo"]][posicoes] = classe
+
+    df = pd.DataFrame(colunas, columns=perfil["colunas"])
+    # Mesma granularidade da base original.
+    df["Age"] = df["Age"].round(1)
+    df["Height"] = df["Height"].round(2)
+    df["Weight"] = df["Weight"].round(1)
+    for coluna in COLUNAS_DISCRETAS_ARREDONDAR:
+        df[coluna] = df[coluna].astype(np.int64)
+    return df
+
+
+def gerar_csv(
+    perfil: dict,
+    n_linhas: int,
+    output_path: Path,
+    chunksize: int = 1_000_000,
+    seed: int = 42,
+) -> Path:
+    # Escreve em blocos: a memória depende do chunksize, não do total de linhas.
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for i, inicio in enumerate(range(0, n_linhas, chunksize) or [0]):
+        bloco = gerar_linhas(perfil, min(chunksize, n_linhas - inicio), rng)
+        bloco.to_csv(
+            output_path,
+            mode="w" if i == 0 else "a",
+            header=i == 0,
+            index=False,
+            encoding="utf-8",
+        )
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default="data/raw/Obesity.csv")
+    parser.add_argument("--target", default="Obesity")
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="Perfil JSON já ajustado (dispensa a base real).",
+    )
+    parser.add_argument(
+        "--profile_out", default=None, help="Salva o perfil ajustado em JSON."
+    )
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.profile:
+        perfil = json.loads(Path(args.profile).read_text(encoding="utf-8"))
+    else:
+        perfil = ajustar_perfil(pd.read_csv(args.data), coluna_alvo=args.target)
+    if args.profile_out:
+        Path(args.profile_out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.profile_out).write_text(
+            json.dumps(perfil, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+
+    inicio = time.perf_counter()
+    gerar_csv(perfil, args.rows, args.output, args.chunksize, args.seed)
+    duracao = time.perf_counter() - inicio
+    print(
+        f"OK: gerou {args.rows} linhas sintéticas em {duracao:.2f}s "
+        f"({args.rows / max(duracao, 1e-9):,.0f} linhas/s) | saída em {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,44 @@
 import argparse
 import json
+import math
+import os
+import shutil
+from datetime import datetime, timezone
 from pathlib import Path
+import numpy as np
 import pandas as pd
-from joblib import dump
+from joblib import dump, load
 from sklearn.model_selection import train_test_split
 from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, MinMaxScaler
+from sklearn.preprocessing import OneHotEncoder, MinMaxScaler, OrdinalEncoder
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 from sklearn.ensemble import RandomForestClassifier
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
-from src.obesity_tc.make_dataset import preprocessar_base
+from src.obesity_tc.compact_forest import salvar_floresta, salvar_floresta_mmap
+from src.obesity_tc.cross_validation import validar_cruzado
+from src.obesity_tc.distill import TIPOS_ALUNO, avaliar_aluno, destilar
+from src.obesity_tc.drift import MonitorDeriva
+from src.obesity_tc.instrumentation import ativar, prever_por_etapas
+from src.obesity_tc.make_dataset import carregar_base_processada, hash_linhas
+from src.obesity_tc.profiling import perfilar
+from src.obesity_tc.registry import (
+    ARQUIVO_FLORESTA,
+    ARQUIVO_METRICAS,
+    ARQUIVO_MODELO,
+    ARQUIVO_PERFIL,
+    DIRETORIO_MMAP,
+    caminho_atual,
+    descartar_antigas,
+    nova_versao,
+    publicar,
+)
+from src.obesity_tc.stage_cache import CacheEtapas, ajustar_pipeline
+from src.obesity_tc.search import (
+    escolher_menor_modelo,
+    executar_busca,
+    varrer_tamanho_floresta,
+)
 
 MAPA_NIVEL_OBESIDADE = {
     "Insufficient_Weight": "Peso insuficiente",
@@ -23,19 +51,48 @@ MAPA_NIVEL_OBESIDADE = {
 }
 
 
-def build_pipeline(colunas_numericas, colunas_categoricas, random_state=42):
+# onehot: MinMaxScaler + OneHotEncoder (padrão). ordinal: numéricas cruas e um
+# código inteiro por categórica, tudo em float32 (as árvores não precisam de
+# escala nem de colunas binárias).
+CODIFICACOES = ["onehot", "ordinal"]
+
+
+def build_pipeline(
+    colunas_numericas,
+    colunas_categoricas,
+    random_state=42,
+    n_estimators=500,
+    max_depth=None,
+    max_features="sqrt",
+    k_neighbors=5,
+    codificacao="onehot",
+):
     # Prepara transformações específicas para numéricas e categóricas.
-    pre = ColumnTransformer(
-        transformers=[
+    if codificacao == "ordinal":
+        transformadores = [
+            ("num", "passthrough", colunas_numericas),
+            (
+                "cat",
+                OrdinalEncoder(
+                    handle_unknown="use_encoded_value",
+                    unknown_value=-1,
+                    dtype=np.float32,
+                ),
+                colunas_categoricas,
+            ),
+        ]
+    else:
+        transformadores = [
             ("num", MinMaxScaler(), colunas_numericas),
             ("cat", OneHotEncoder(handle_unknown="ignore"), colunas_categoricas),
-        ],
-        remainder="drop",
-    )
+        ]
+    pre = ColumnTransformer(transformers=transformadores, remainder="drop")
 
     # Modelo principal do projeto.
     clf = RandomForestClassifier(
-        n_estimators=500,
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        max_features=max_features,
         random_state=random_state,
         n_jobs=-1,
         class_weight=None,
@@ -45,38 +102,19 @@ def build_pipeline(colunas_numericas, colunas_categoricas, random_state=42):
     pipe = ImbPipeline(
         steps=[
             ("preprocess", pre),
-            ("smote", SMOTE(random_state=random_state)),
+            ("smote", SMOTE(random_state=random_state, k_neighbors=k_neighbors)),
             ("model", clf),
         ]
     )
     return pipe
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--data", required=True, help="CSV bruto (Obesity.csv)")
-    parser.add_argument(
-        "--target", default="Obesity", help="Nome da coluna alvo no CSV bruto"
-    )
-    parser.add_argument("--model_out", default="models/modelo_obesidade.joblib")
-    parser.add_argument("--test_size", type=float, default=0.2)
-    parser.add_argument("--random_state", type=int, default=42)
-    parser.add_argument(
-        "--min_accuracy",
-        type=float,
-        default=0.75,
-        help="Critério mínimo de acurácia",
-    )
-    args = parser.parse_args()
-
-    # Carrega dados brutos e aplica pré-processamento padrão.
-    df_bruto = pd.read_csv(args.data)
-    df_limpo = preprocessar_base(df_bruto, coluna_alvo=args.target)
-
+def separar_entradas(df_limpo: pd.DataFrame):
     if "Obesity_level" not in df_limpo.columns:
         raise ValueError("Não encontrei a coluna alvo. Verifique --target.")
 
-    alvo = df_limpo["Obesity_level"]
+    # Rótulos como strings (a base processada guarda o alvo como categórico).
+    alvo = df_limpo["Obesity_level"].astype(object)
     entradas = df_limpo.drop(columns=["Obesity_level"])
 
     # Separa colunas numéricas e categóricas para o pipeline.
@@ -84,42 +122,33 @@ def main():
         c for c in entradas.columns if pd.api.types.is_numeric_dtype(entradas[c])
     ]
     colunas_categoricas = [c for c in entradas.columns if c not in colunas_numericas]
+    return entradas, alvo, colunas_numericas, colunas_categoricas
 
-    # Divide treino e teste com estratificação por classe.
-    entradas_treino, entradas_teste, alvo_treino, alvo_teste = train_test_split(
-        entradas,
-        alvo,
-        test_size=args.test_size,
-        random_state=args.random_state,
-        stratify=alvo,
-    )
-
-    # Treina o pipeline completo.
-    pipe = build_pipeline(
-        colunas_numericas, colunas_categoricas, random_state=args.random_state
-    )
-    pipe.fit(entradas_treino, alvo_treino)
-
-    # Avalia o modelo no conjunto de teste.
-    predicoes = pipe.predict(entradas_teste)
-    acuracia = float(accuracy_score(alvo_teste, predicoes))
 
-    dir_relatorios = Path("reports")
+def salvar_relatorios(
+    alvo_teste,
+    predicoes,
+    classes_ordenadas,
+    n_treino: int,
+    dir_relatorios: Path = Path("reports"),
+    extras: dict = None,
+) -> float:
+    dir_relatorios = Path(dir_relatorios)
     dir_relatorios.mkdir(parents=True, exist_ok=True)
-
-    classes_ordenadas = sorted(alvo.unique().tolist())
+    acuracia = float(accuracy_score(alvo_teste, predicoes))
     classes_pt = [MAPA_NIVEL_OBESIDADE.get(c, c) for c in classes_ordenadas]
 
     # Consolida métricas e matriz de confusão para relatório.
     metricas = {
         "acuracia": acuracia,
-        "n_treino": int(len(entradas_treino)),
-        "n_teste": int(len(entradas_teste)),
+        "n_treino": int(n_treino),
+        "n_teste": int(len(alvo_teste)),
         "classes": classes_pt,
         "classes_original": classes_ordenadas,
         "matriz_confusao": confusion_matrix(
             alvo_teste, predicoes, labels=classes_ordenadas
         ).tolist(),
+        **(extras or {}),
     }
 
     # Salva relatórios para uso no app e documentação.
@@ -136,9 +165,20 @@ def main():
         ),
         encoding="utf-8",
     )
+    return acuracia
 
+
+def salvar_modelo(
+    pipe,
+    colunas_numericas,
+    colunas_categoricas,
+    model_out,
+    forest_out=None,
+    mmap_out=None,
+    **extras,
+) -> Path:
     # Salva o bundle do modelo treinado.
-    model_path = Path(args.model_out)
+    model_path = Path(model_out)
     model_path.parent.mkdir(parents=True, exist_ok=True)
     dump(
         {
@@ -146,23 +186,570 @@ def main():
             "num_cols": colunas_numericas,
             "cat_cols": colunas_categoricas,
             "target": "Obesity_level",
+            **extras,
         },
         model_path,
     )
+    if forest_out:
+        salvar_floresta(pipe, forest_out)
+    if mmap_out:
+        salvar_floresta_mmap(pipe, mmap_out)
+    return model_path
 
-    print(f"OK: acurácia={acuracia:.4f} | modelo salvo em {model_path}")
-    print(
-        f"Relatórios: {dir_relatorios / 'metrics.json'} e "
-        f"{dir_relatorios / 'classification_report.txt'}"
+
+def publicar_versao(
+    args, pipe, colunas_numericas, colunas_categoricas, perfil, **extras
+) -> dict:
+    # Todos os artefatos vão para um diretório de versão novo; o ponteiro
+    # models/ATUAL.json só muda depois que a versão está completa e carrega.
+    diretorio = nova_versao(args.models_dir)
+    salvar_modelo(
+        pipe,
+        colunas_numericas,
+        colunas_categoricas,
+        diretorio / ARQUIVO_MODELO,
+        diretorio / ARQUIVO_FLORESTA,
+        diretorio / DIRETORIO_MMAP,
+        **extras,
     )
+    perfil.salvar_perfil(diretorio / ARQUIVO_PERFIL)
+    shutil.copy2(Path("reports") / "metrics.json", diretorio / ARQUIVO_METRICAS)
+    ultima_versao_dados = extras["versoes_dados"][-1]
+    ponteiro = publicar(
+        diretorio,
+        args.models_dir,
+        hash_dados=ultima_versao_dados["hash"],
+        n_linhas=ultima_versao_dados["n_linhas"],
+        codificacao=extras.get("codificacao", "onehot"),
+    )
+    descartar_antigas(args.models_dir, manter=args.keep_versions)
+    return ponteiro
+
 
-    # Criterio minimo
-    if acuracia < args.min_accuracy:
+def verificar_criterio(acuracia: float, min_accuracy: float) -> None:
+    if acuracia < min_accuracy:
         raise SystemExit(
-            f"FALHA: acurácia {acuracia:.4f} < {args.min_accuracy:.2f} "
+            f"FALHA: acurácia {acuracia:.4f} < {min_accuracy:.2f} "
             "(critério mínimo)"
         )
 
 
+def _amostrar_reposicao(alvo_antigo: pd.Series, fracao: float, minimo: int, seed: int):
+    # Amostra estratificada das linhas já treinadas, garantindo todas as classes.
+    rng = np.random.default_rng(seed)
+    escolhidos = []
+    for _, indices in alvo_antigo.groupby(alvo_antigo).groups.items():
+        quantidade = min(len(indices), max(minimo, math.ceil(len(indices) * fracao)))
+        escolhidos.extend(rng.choice(np.asarray(indices), quantidade, replace=False))
+    return sorted(escolhidos)
+
+
+def destilar_aluno(
+    pipe,
+    entradas_treino,
+    alvo_treino,
+    entradas_teste,
+    alvo_teste,
+    predicoes,
+    tipo: str,
+    max_depth: int,
+    linhas_sinteticas: int,
+    random_state: int,
+    min_accuracy: float,
+):
+    # Retorna as métricas e o trecho do bundle ({} quando o aluno é reprovado).
+    aluno = destilar(
+        pipe,
+        entradas_treino,
+        alvo_treino,
+        tipo=tipo,
+        n_sinteticas=linhas_sinteticas,
+        max_depth=max_depth,
+        random_state=random_state,
+    )
+    metricas = {
+        "tipo": tipo,
+        "max_depth": max_depth,
+        "linhas_sinteticas": linhas_sinteticas,
+        **avaliar_aluno(aluno, pipe, entradas_teste, alvo_teste, predicoes),
+    }
+    metricas["aprovado"] = metricas["acuracia"] >= min_accuracy
+    if not metricas["aprovado"]:
+        return metricas, {}
+    return metricas, {"aluno": {"pipeline": aluno, **metricas}}
+
+
+def treinar_incremental(args) -> None:
+    model_path = caminho_atual(ARQUIVO_MODELO, args.models_dir)
+    if not model_path.exists():
+        raise SystemExit(
+            f"Modelo não encontrado em {model_path}; rode um treino completo primeiro."
+        )
+    pacote = load(model_path)
+    versoes = pacote.get("versoes_dados")
+    if not versoes:
+        raise SystemExit(
+            "O bundle não registra a versão dos dados; rode um treino completo uma vez."
+        )
+
+    # As linhas já vistas precisam continuar idênticas (a base só recebe acréscimos).
+    df_limpo = carregar_base_processada(args.data, coluna_alvo=args.target)
+    n_vistas = versoes[-1]["n_linhas"]
+    if (
+        len(df_limpo) < n_vistas
+        or hash_linhas(df_limpo.iloc[:n_vistas]) != versoes[-1]["hash"]
+    ):
+        raise SystemExit(
+            "As linhas já treinadas mudaram; rode um treino completo (sem --incremental)."
+        )
+    if len(df_limpo) == n_vistas:
+        print("OK: nenhuma linha nova; modelo mantido.")
+        return
+
+    entradas, alvo, _, _ = separar_entradas(df_limpo)
+    novos = entradas.index[n_vistas:]
+
+    # Parte das linhas novas vira teste; estratifica quando há exemplos suficientes.
+    contagem_novos = alvo.loc[novos].value_counts()
+    estratificar = contagem_novos.min() >= 2 and len(contagem_novos) > 1
+    if len(novos) >= 5:
+        novos_treino, novos_teste = train_test_split(
+            novos,
+            test_size=args.test_size,
+            random_state=args.random_state,
+            stratify=alvo.loc[novos] if estratificar else None,
+        )
+    else:
+        novos_treino, novos_teste = novos, novos[:0]
+    indices_teste = list(pacote.get("indices_teste", [])) + [int(i) for i in novos_teste]
+
+    # Reposição de linhas antigas na mesma proporção das novas (mantém as classes).
+    antigos_treino = entradas.index[:n_vistas].difference(indices_teste)
+    k_vizinhos = pacote["pipeline"].named_steps["smote"].k_neighbors
+    reposicao = _amostrar_reposicao(
+        alvo.loc[antigos_treino],
+        fracao=len(novos_treino) / max(len(antigos_treino), 1),
+        minimo=k_vizinhos + 1,
+        seed=args.random_state + len(versoes),
+    )
+    indices_lote = list(reposicao) + list(novos_treino)
+
+    # Reaproveita o pré-processamento ajustado; só as árvores novas são treinadas.
+    pipe = pacote["pipeline"]
+    matriz = pipe.named_steps["preprocess"].transform(entradas.loc[indices_lote])
+    alvo_lote = alvo.loc[indices_lote]
+    k_efetivo = min(k_vizinhos, int(alvo_lote.value_counts().min()) - 1)
+    if k_efetivo >= 1:
+        matriz, alvo_lote = SMOTE(
+            random_state=args.random_state, k_neighbors=k_efetivo
+        ).fit_resample(matriz, alvo_lote)
+
+    modelo = pipe.named_steps["model"]
+    n_atual = len(modelo.estimators_)
+    n_novas = args.n_new_trees or max(
+        1, math.ceil(n_atual * len(novos) / n_vistas)
+    )
+    modelo.set_params(warm_start=True, n_estimators=n_atual + n_novas)
+    modelo.fit(matriz, alvo_lote)
+    modelo.set_params(warm_start=False)
+
+    numero_versao = versoes[-1]["versao"] + 1
+    versoes_arvores = list(pacote["versoes_arvores"]) + [numero_versao] * n_novas
+
+    # Substitui as árvores mais antigas se houver teto para o tamanho da floresta.
+    if args.max_trees and len(modelo.estimators_) > args.max_trees:
+        excesso = len(modelo.estimators_) - args.max_trees
+        modelo.estimators_ = modelo.estimators_[excesso:]
+        modelo.n_estimators = len(modelo.estimators_)
+        versoes_arvores = versoes_arvores[excesso:]
+
+    # Avalia em todo o conjunto de teste acumulado antes de substituir o modelo.
+    predicoes = pipe.predict(entradas.loc[indices_teste])
+    acuracia = float(accuracy_score(alvo.loc[indices_teste], predicoes))
+    verificar_criterio(acuracia, args.min_accuracy)
+
+    # O aluno imitava a floresta anterior: destila de novo com os mesmos
+    # parâmetros, para não publicar um aluno defasado em relação às árvores novas.
+    metricas_aluno, pacote_aluno = None, {}
+    if "aluno" in pacote:
+        anterior = pacote["aluno"]
+        metricas_aluno, pacote_aluno = destilar_aluno(
+            pipe,
+            entradas.drop(index=indices_teste),
+            alvo.drop(index=indices_teste),
+            entradas.loc[indices_teste],
+            alvo.loc[indices_teste],
+            predicoes,
+            tipo=anterior["tipo"],
+            max_depth=anterior["max_depth"],
+            linhas_sinteticas=anterior["linhas_sinteticas"],
+            random_state=args.random_state,
+            min_accuracy=args.min_accuracy,
+        )
+
+    salvar_relatorios(
+        alvo.loc[indices_teste],
+        predicoes,
+        sorted(alvo.unique().tolist()),
+        n_treino=len(entradas) - len(indices_teste),
+        extras={
+            "versao_dados": numero_versao,
+            "arvores_novas": n_novas,
+            **({"aluno": metricas_aluno} if metricas_aluno else {}),
+        },
+    )
+    versoes = list(versoes) + [
+        {
+            "versao": numero_versao,
+            "hash": hash_linhas(df_limpo),
+            "n_linhas": int(len(df_limpo)),
+            "criado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+    ]
+    ponteiro = publicar_versao(
+        args,
+        pipe,
+        pacote["num_cols"],
+        pacote["cat_cols"],
+        MonitorDeriva.construir(entradas.drop(index=indices_teste), predicoes),
+        versoes_dados=versoes,
+        versoes_arvores=versoes_arvores,
+        indices_teste=indices_teste,
+        codificacao=pacote.get("codificacao", "onehot"),
+        **pacote_aluno,
+    )
+    print(
+        f"OK: +{n_novas} árvores com {len(novos)} linhas novas (versão "
+        f"{numero_versao}) | {len(modelo.estimators_)} árvores | "
+        f"acurácia={acuracia:.4f} | versão {ponteiro['versao']} publicada"
+    )
+    if metricas_aluno:
+        print(
+            f"Aluno ({metricas_aluno['tipo']}) destilado de novo: acurácia="
+            f"{metricas_aluno['acuracia']:.4f}"
+        )
+    if metricas_aluno and not metricas_aluno["aprovado"]:
+        print(
+            f"AVISO: aluno com acurácia {metricas_aluno['acuracia']:.4f} < "
+            f"{args.min_accuracy:.2f}; a versão {ponteiro['versao']} foi publicada "
+            "sem aluno (--student indisponível até um novo treino completo)."
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", required=True, help="CSV bruto (Obesity.csv)")
+    parser.add_argument(
+        "--target", default="Obesity", help="Nome da coluna alvo no CSV bruto"
+    )
+    parser.add_argument(
+        "--models_dir",
+        default="models",
+        help="Registro: versões em <dir>/versoes, ponteiro em <dir>/ATUAL.json.",
+    )
+    parser.add_argument(
+        "--keep_versions",
+        type=int,
+        default=5,
+        help="Versões mantidas no registro (a ativa nunca é removida).",
+    )
+    parser.add_argument(
+        "--encoding",
+        choices=CODIFICACOES,
+        default="onehot",
+        help="onehot (MinMax + one-hot) ou ordinal (float32 cru + códigos inteiros).",
+    )
+    parser.add_argument("--test_size", type=float, default=0.2)
+    parser.add_argument("--random_state", type=int, default=42)
+    parser.add_argument(
+        "--min_accuracy",
+        type=float,
+        default=0.75,
+        help="Critério mínimo de acurácia",
+    )
+    parser.add_argument(
+        "--search",
+        choices=["grid", "random"],
+        default=None,
+        help="Busca de hiperparâmetros em paralelo (não salva o modelo).",
+    )
+    parser.add_argument(
+        "--n_iter", type=int, default=20, help="Candidatos da busca aleatória."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processos usados na busca.",
+    )
+    parser.add_argument(
+        "--max_predict_ms",
+        type=float,
+        default=None,
+        help=(
+            "Varre tamanho/profundidade da floresta e escolhe o menor modelo com "
+            "latência de 1 linha <= este valor e acurácia >= --min_accuracy."
+        ),
+    )
+    parser.add_argument(
+        "--cv",
+        type=int,
+        default=None,
+        help="Validação cruzada estratificada com K folds em paralelo (--workers).",
+    )
+    parser.add_argument(
+        "--stage_cache_mb",
+        type=float,
+        default=1024,
+        help=(
+            "Limite (MB) do cache em disco das saídas do ColumnTransformer e do "
+            "SMOTE; 0 desativa."
+        ),
+    )
+    parser.add_argument(
+        "--instrument",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Mede tempo de relógio e de CPU por etapa no metrics.json.",
+    )
+    parser.add_argument(
+        "--instrument_memory",
+        action="store_true",
+        help="Inclui o pico de memória por etapa (tracemalloc; treino mais lento).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Acrescenta árvores treinadas só nas linhas novas ao modelo existente.",
+    )
+    parser.add_argument(
+        "--n_new_trees",
+        type=int,
+        default=None,
+        help="Árvores novas no modo incremental (padrão: proporcional às linhas novas).",
+    )
+    parser.add_argument(
+        "--max_trees",
+        type=int,
+        default=None,
+        help="Teto de árvores; no modo incremental as mais antigas são descartadas.",
+    )
+    parser.add_argument(
+        "--student",
+        choices=TIPOS_ALUNO,
+        default=None,
+        help="Destila a floresta em um modelo aluno mais barato, salvo no bundle.",
+    )
+    parser.add_argument(
+        "--student_depth", type=int, default=12, help="Profundidade máxima do aluno."
+    )
+    parser.add_argument(
+        "--student_rows",
+        type=int,
+        default=20_000,
+        help="Linhas sintéticas rotuladas pelo professor para treinar o aluno.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfila o treino (cProfile + pilhas amostradas) em reports/profiles/.",
+    )
+    args = parser.parse_args()
+
+    with perfilar("train", args.data, ativo=args.profile):
+        executar(args)
+
+
+def executar(args):
+    if args.incremental:
+        treinar_incremental(args)
+        return
+
+    medidor = (
+        ativar(memoria=args.instrument_memory) if args.instrument else None
+    )
+
+    # Cache das etapas: experimentos repetidos pulam direto para o ajuste do modelo.
+    cache = None
+    if args.stage_cache_mb > 0:
+        cache = CacheEtapas(
+            Path(args.data).parent / ".cache" / "etapas", max_mb=args.stage_cache_mb
+        )
+    df_limpo = carregar_base_processada(
+        args.data,
+        coluna_alvo=args.target,
+        registrar=cache.registrar if cache else None,
+    )
+    entradas, alvo, colunas_numericas, colunas_categoricas = separar_entradas(df_limpo)
+    # Carga da base guardada à parte: o medidor é zerado antes do ajuste final.
+    etapas_carga = medidor.resumo() if medidor else {}
+
+    # Divide treino e teste com estratificação por classe.
+    entradas_treino, entradas_teste, alvo_treino, alvo_teste = train_test_split(
+        entradas,
+        alvo,
+        test_size=args.test_size,
+        random_state=args.random_state,
+        stratify=alvo,
+    )
+
+    if args.search:
+        # Modo de busca: gera o ranking de candidatos e não sobrescreve o modelo.
+        ranking = executar_busca(
+            entradas_treino,
+            alvo_treino,
+            entradas_teste,
+            alvo_teste,
+            build_pipeline(
+                colunas_numericas, colunas_categoricas, codificacao=args.encoding
+            ).named_steps["preprocess"],
+            modo=args.search,
+            n_iter=args.n_iter,
+            workers=args.workers,
+            random_state=args.random_state,
+        )
+        melhor = ranking.iloc[0]
+        print(
+            f"OK: {len(ranking)} candidatos avaliados | melhor acurácia="
+            f"{melhor['acuracia']:.4f} ({melhor['parametros']})"
+        )
+        print(f"Ranking: {Path('reports') / 'search_leaderboard.csv'}")
+        return
+
+    # Treina o pipeline completo.
+    pipe = build_pipeline(
+        colunas_numericas,
+        colunas_categoricas,
+        random_state=args.random_state,
+        codificacao=args.encoding,
+    )
+    extras = {"codificacao": args.encoding}
+    if args.max_predict_ms is not None:
+        # Curva acurácia x latência; o modelo final é o menor que cumpre os dois.
+        curva = varrer_tamanho_floresta(
+            pipe, entradas_treino, alvo_treino, entradas_teste, alvo_teste, cache=cache
+        )
+        escolhido = escolher_menor_modelo(curva, args.max_predict_ms, args.min_accuracy)
+        extras["curva_tamanho_floresta"] = curva
+        extras["orcamento_predict_ms"] = args.max_predict_ms
+        if escolhido is None:
+            raise SystemExit(
+                f"FALHA: nenhuma floresta da varredura atinge acurácia >= "
+                f"{args.min_accuracy:.2f} com predict <= {args.max_predict_ms} ms."
+            )
+        extras["modelo_escolhido"] = escolhido
+        print(
+            f"Varredura: {len(curva)} pontos | escolhido n_estimators="
+            f"{escolhido['n_estimators']}, max_depth={escolhido['max_depth']} "
+            f"(acurácia={escolhido['acuracia']:.4f}, "
+            f"{escolhido['latencia_predict_ms']:.1f} ms)"
+        )
+        pipe.set_params(
+            model__n_estimators=escolhido["n_estimators"],
+            model__max_depth=escolhido["max_depth"],
+        )
+    if args.cv:
+        # Estimativa menos ruidosa que o split único, com a configuração final.
+        validacao = validar_cruzado(
+            pipe,
+            entradas,
+            alvo,
+            n_folds=args.cv,
+            workers=args.workers,
+            random_state=args.random_state,
+        )
+        extras["validacao_cruzada"] = validacao
+        print(
+            f"Validação cruzada ({args.cv} folds, {validacao['workers']} processos): "
+            f"acurácia={validacao['acuracia_media']:.4f} "
+            f"± {validacao['acuracia_desvio']:.4f} | "
+            f"{validacao['tempo_total_s']:.1f}s ({validacao['aceleracao']:.1f}x)"
+        )
+    if medidor:
+        # Varredura e folds de validação ajustam o pipeline várias vezes; os
+        # tempos por etapa refletem só o ajuste final e a avaliação.
+        medidor.reiniciar(manter=etapas_carga)
+    ajustar_pipeline(pipe, entradas_treino, alvo_treino, cache)
+    if cache:
+        extras["cache_etapas"] = cache.resumo()
+
+    # Avalia o modelo no conjunto de teste.
+    predicoes = prever_por_etapas(pipe, entradas_teste)
+
+    # Aluno destilado: mesmo critério mínimo, medido contra o alvo real.
+    metricas_aluno, pacote_aluno = None, {}
+    if args.student:
+        metricas_aluno, pacote_aluno = destilar_aluno(
+            pipe,
+            entradas_treino,
+            alvo_treino,
+            entradas_teste,
+            alvo_teste,
+            predicoes,
+            tipo=args.student,
+            max_depth=args.student_depth,
+            linhas_sinteticas=args.student_rows,
+            random_state=args.random_state,
+            min_accuracy=args.min_accuracy,
+        )
+
+    # Resumo tirado depois da destilação e da avaliação: é o que vai para o
+    # metrics.json e o que se imprime no fim.
+    if medidor:
+        extras["etapas"] = medidor.resumo()
+    acuracia = salvar_relatorios(
+        alvo_teste,
+        predicoes,
+        sorted(alvo.unique().tolist()),
+        n_treino=len(entradas_treino),
+        extras={**extras, **({"aluno": metricas_aluno} if metricas_aluno else {})},
+    )
+
+    # Registra a versão dos dados usada por cada árvore (base do modo incremental).
+    versao = {
+        "versao": 1,
+        "hash": hash_linhas(df_limpo),
+        "n_linhas": int(len(entradas)),
+        "criado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    # Criterio minimo: um modelo reprovado nem chega a virar versão.
+    verificar_criterio(acuracia, args.min_accuracy)
+    ponteiro = publicar_versao(
+        args,
+        pipe,
+        colunas_numericas,
+        colunas_categoricas,
+        # Entradas do treino e mistura de classes previstas no teste.
+        MonitorDeriva.construir(entradas_treino, predicoes),
+        versoes_dados=[versao],
+        versoes_arvores=[1] * len(pipe.named_steps["model"].estimators_),
+        indices_teste=[int(i) for i in entradas_teste.index],
+        codificacao=args.encoding,
+        **pacote_aluno,
+    )
+
+    print(
+        f"OK: acurácia={acuracia:.4f} | versão {ponteiro['versao']} publicada em "
+        f"{args.models_dir}/versoes (carga {ponteiro['tempo_carga_ms']:.0f} ms)"
+    )
+    if metricas_aluno:
+        print(
+            f"Aluno ({args.student}): acurácia={metricas_aluno['acuracia']:.4f} | "
+            f"concordância com a floresta={metricas_aluno['concordancia_professor']:.4f}"
+            f" | 1 linha {metricas_aluno['latencia_1_linha_ms']:.2f} ms "
+            f"(floresta {metricas_aluno['latencia_1_linha_professor_ms']:.2f} ms)"
+        )
+    if medidor:
+        print("Etapas:")
+        medidor.imprimir(extras["etapas"])
+    print("Relatórios: reports/metrics.json e reports/classification_report.txt")
+
+    if metricas_aluno and not metricas_aluno["aprovado"]:
+        raise SystemExit(
+            f"FALHA: aluno com acurácia {metricas_aluno['acuracia']:.4f} < "
+            f"{args.min_accuracy:.2f} (critério mínimo); não foi salvo no bundle."
+        )
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+from joblib import dump
+
+from src.obesity_tc.make_dataset import carregar_base_processada
+from src.obesity_tc.train import build_pipeline, separar_entradas
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CAMINHO_BASE = BASE_DIR / "data/raw/Obesity.csv"
+
+
+@pytest.fixture(scope="session")
+def base_limpa():
+    return carregar_base_processada(CAMINHO_BASE)
+
+
+@pytest.fixture(scope="session")
+def bundle(tmp_path_factory, base_limpa):
+    # Floresta pequena treinada em 80% da base; as demais linhas ficam de fora.
+    entradas, alvo, colunas_numericas, colunas_categoricas = separar_entradas(
+        base_limpa
+    )
+    treino = entradas.sample(frac=0.8, random_state=0).index
+    pipe = build_pipeline(colunas_numericas, colunas_categoricas, n_estimators=20)
+    pipe.named_steps["model"].n_jobs = 1
+    pipe.fit(entradas.loc[treino], alvo.loc[treino])
+    caminho = tmp_path_factory.mktemp("modelo") / "modelo_obesidade.joblib"
+    dump(
+        {
+            "pipeline": pipe,
+            "num_cols": colunas_numericas,
+            "cat_cols": colunas_categoricas,
+            "target": "Obesity",
+        },
+        caminho,
+    )
+    return {
+        "caminho": caminho,
+        "pipeline": pipe,
+        "teste": entradas.drop(index=treino),
+    }
@@ -0,0 +1,21 @@
+import warnings
+
+from src.obesity_tc.aggregates import CuboContagens
+from src.obesity_tc.make_dataset import preprocessar_base
+
+
+def test_categorias_extras_entram_nas_contagens(base_limpa):
+    brutas = base_limpa.head(50).drop(columns="BMI")
+    brutas = brutas.astype({c: object for c in brutas.select_dtypes("category")})
+    brutas = brutas.rename(columns={"Obesity_level": "Obesity"})
+    brutas.loc[brutas.index[:5], "MTRANS"] = "Patinete"
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        df = preprocessar_base(brutas)
+
+    cubo = CuboContagens.construir(df)
+    tabela = cubo.por_categoria("MTRANS")
+    assert tabela.loc["Patinete"].sum() == 5
+    assert tabela.to_numpy().sum() == cubo.total() == len(df)
+    contagem = df.groupby(["MTRANS", "Obesity_level"], observed=True).size()
+    assert tabela.stack().loc[lambda s: s > 0].to_dict() == contagem.to_dict()
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.obesity_tc.compact_forest import (
+    FlorestaCompacta,
+    salvar_floresta,
+    salvar_floresta_mmap,
+)
+from src.obesity_tc.make_dataset import COLUNAS_DISCRETAS_ARREDONDAR, preprocessar_base
+from src.obesity_tc.train import CODIFICACOES, build_pipeline, separar_entradas
+
+
+@pytest.fixture(scope="module", params=CODIFICACOES)
+def pipeline_e_fora_do_treino(request, base_limpa):
+    entradas, alvo, colunas_numericas, colunas_categoricas = separar_entradas(
+        base_limpa
+    )
+    treino = entradas.sample(frac=0.8, random_state=1).index
+    pipe = build_pipeline(
+        colunas_numericas,
+        colunas_categoricas,
+        n_estimators=30,
+        codificacao=request.param,
+    )
+    pipe.named_steps["model"].n_jobs = 1
+    pipe.fit(entradas.loc[treino], alvo.loc[treino])
+    return pipe, entradas.drop(index=treino)
+
+
+def _perturbar(entradas: pd.DataFrame, copias: int = 20) -> pd.DataFrame:
+    # Linhas novas em torno das de teste: medidas com ruído, recalculando o IMC.
+    rng = np.random.default_rng(0)
+    brutas = pd.concat([entradas.drop(columns="BMI")] * copias, ignore_index=True)
+    brutas = brutas.astype({c: object for c in brutas.select_dtypes("category")})
+    for coluna, escala in [("Age", 3.0), ("Height", 0.05), ("Weight", 8.0)]:
+        brutas[coluna] = brutas[coluna].astype(float) + rng.normal(
+            0, escala, len(brutas)
+        )
+    for coluna in COLUNAS_DISCRETAS_ARREDONDAR:
+        brutas[coluna] = brutas[coluna].astype(float) + rng.normal(0, 0.4, len(brutas))
+    return preprocessar_base(brutas)
+
+
+def test_transformacao_identica_ao_pipeline(pipeline_e_fora_do_treino):
+    pipe, fora_do_treino = pipeline_e_fora_do_treino
+    entradas = _perturbar(fora_do_treino)
+    esperado = pipe.named_steps["preprocess"].transform(entradas)
+    esperado = np.asarray(
+        esperado.toarray() if hasattr(esperado, "toarray") else esperado,
+        dtype=np.float32,
+    )
+    obtido = FlorestaCompacta.do_pipeline(pipe).transformar(entradas)
+    np.testing.assert_array_equal(obtido, esperado)
+
+
+def test_predicoes_identicas_fora_do_treino(pipeline_e_fora_do_treino, tmp_path):
+    pipe, fora_do_treino = pipeline_e_fora_do_treino
+    entradas = pd.concat([fora_do_treino, _perturbar(fora_do_treino)])
+    floresta = FlorestaCompacta.carregar(salvar_floresta(pipe, tmp_path / "f.npz"))
+    np.testing.assert_array_equal(floresta.predict(entradas), pipe.predict(entradas))
+    np.testing.assert_array_equal(
+        floresta.predict_proba(entradas), pipe.predict_proba(entradas)
+    )
+
+
+def test_mmap_com_nan_identico_ao_pipeline(pipeline_e_fora_do_treino, tmp_path):
+    pipe, fora_do_treino = pipeline_e_fora_do_treino
+    entradas = fora_do_treino.copy()
+    entradas.loc[entradas.index[::3], "Age"] = np.nan
+    floresta = FlorestaCompacta.mapear(salvar_floresta_mmap(pipe, tmp_path / "f"))
+    np.testing.assert_array_equal(
+        floresta.predict_proba(entradas), pipe.predict_proba(entradas)
+    )
@@ -0,0 +1,129 @@
+import multiprocessing
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.obesity_tc import predict
+from src.obesity_tc.drift import COLUNA_CLASSE, MonitorDeriva
+
+CAMINHO_BASE = Path(__file__).resolve().parents[1] / "data/raw/Obesity.csv"
+
+
+@pytest.fixture(scope="module")
+def perfil(tmp_path_factory, base_limpa):
+    entradas = base_limpa.drop(columns="Obesity_level")
+    caminho = tmp_path_factory.mktemp("deriva") / "perfil.json"
+    monitor = MonitorDeriva.construir(entradas, base_limpa["Obesity_level"])
+    monitor.salvar_perfil(caminho)
+    return caminho
+
+
+def _contar(perfil, base_limpa, n: int) -> MonitorDeriva:
+    monitor = MonitorDeriva.carregar_perfil(perfil)
+    amostra = base_limpa.head(n)
+    monitor.atualizar(amostra, amostra["Obesity_level"])
+    return monitor
+
+
+def test_salvar_de_novo_nao_duplica(perfil, base_limpa, tmp_path):
+    estado = tmp_path / "estado.json"
+    monitor = _contar(perfil, base_limpa, 10)
+    monitor.salvar_estado(estado)
+    monitor.salvar_estado(estado)
+    retomado = MonitorDeriva.carregar_perfil(perfil)
+    retomado.carregar_estado(estado)
+    assert retomado.n == 10
+
+
+def test_gravadores_independentes_somam(perfil, base_limpa, tmp_path):
+    estado = tmp_path / "estado.json"
+    primeiro = _contar(perfil, base_limpa, 10)
+    segundo = _contar(perfil, base_limpa, 5)
+    primeiro.salvar_estado(estado)
+    segundo.salvar_estado(estado)
+    primeiro.atualizar(base_limpa.head(3), base_limpa["Obesity_level"].head(3))
+    primeiro.salvar_estado(estado)
+
+    total = MonitorDeriva.carregar_perfil(perfil)
+    total.carregar_estado(estado)
+    assert total.n == 18
+    assert total.contagens[COLUNA_CLASSE].sum() == 18
+    # Quem gravou por último já enxerga o total.
+    assert primeiro.n == 18
+
+
+
+def test_salvar_pendentes_usa_o_delta_local(perfil, base_limpa, tmp_path):
+    estado = tmp_path / "estado.json"
+    # Outra réplica já gravou 7 linhas: o n global não serve de gatilho.
+    _contar(perfil, base_limpa, 7).salvar_estado(estado)
+    monitor = MonitorDeriva.carregar_perfil(perfil)
+    monitor.carregar_estado(estado)
+    monitor.atualizar(base_limpa.head(2), base_limpa["Obesity_level"].head(2))
+    assert monitor.pendentes() == 2
+    assert not monitor.salvar_pendentes(estado, minimo=3)
+    assert monitor.salvar_pendentes(estado, minimo=3, intervalo_s=0)
+    assert monitor.pendentes() == 0
+    assert not monitor.salvar_pendentes(estado, intervalo_s=0)
+
+    total = MonitorDeriva.carregar_perfil(perfil)
+    total.carregar_estado(estado)
+    assert total.n == 9
+
+def _gravar_em_processo(perfil, estado, registro, predicao, vezes):
+    monitor = MonitorDeriva.carregar_perfil(perfil)
+    for _ in range(vezes):
+        monitor.atualizar_registro(registro, predicao)
+        monitor.salvar_estado(estado)
+
+
+def test_processos_concorrentes_nao_perdem_contagens(perfil, base_limpa, tmp_path):
+    estado = tmp_path / "estado.json"
+    linha = base_limpa.iloc[0]
+    registro = {c: v.item() if hasattr(v, "item") else str(v) for c, v in linha.items()}
+    contexto = multiprocessing.get_context("spawn")
+    processos = [
+        contexto.Process(
+            target=_gravar_em_processo,
+            args=(perfil, estado, registro, str(linha["Obesity_level"]), 25),
+        )
+        for _ in range(4)
+    ]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join()
+    total = MonitorDeriva.carregar_perfil(perfil)
+    total.carregar_estado(estado)
+    assert total.n == 100
+
+
+def test_estado_do_predict_e_opcional(tmp_path, bundle, perfil, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    entrada = tmp_path / "entrada.csv"
+    pd.read_csv(CAMINHO_BASE).head(20).to_csv(entrada, index=False)
+    argumentos = [
+        "predict.py",
+        "--input", str(entrada),
+        "--output", str(tmp_path / "saida.csv"),
+        "--model", str(bundle["caminho"]),
+        "--drift_profile", str(perfil),
+        "--workers", "1",
+    ]  # fmt: skip
+
+    # Padrão: deriva só desta execução, nada gravado entre execuções.
+    for _ in range(2):
+        monkeypatch.setattr(sys, "argv", argumentos)
+        predict.main()
+    assert not list(tmp_path.rglob("*.json"))
+
+    # Com --drift_state as execuções se somam de propósito.
+    estado = tmp_path / "models" / "deriva_lote.json"
+    for _ in range(2):
+        monkeypatch.setattr(sys, "argv", argumentos + ["--drift_state", str(estado)])
+        predict.main()
+    total = MonitorDeriva.carregar_perfil(perfil)
+    assert total.carregar_estado(estado)
+    assert total.n == 40
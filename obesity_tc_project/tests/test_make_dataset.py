@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.obesity_tc.make_dataset import (
+    CATEGORIAS_FIXAS,
+    chave_base_processada,
+    preprocessar_base,
+)
+
+CAMINHO_BASE = Path(__file__).resolve().parents[1] / "data/raw/Obesity.csv"
+
+
+@pytest.fixture
+def bruta():
+    return pd.read_csv(CAMINHO_BASE).head(10)
+
+
+def test_base_original_sem_categorias_extras(recwarn):
+    df = preprocessar_base(pd.read_csv(CAMINHO_BASE))
+    assert not recwarn.list
+    for coluna, categorias in CATEGORIAS_FIXAS.items():
+        assert df[coluna].cat.categories.tolist() == categorias
+        assert df[coluna].notna().all()
+
+
+def test_valores_fora_do_esquema_sao_mantidos(bruta):
+    bruta.loc[0, "MTRANS"] = " Scooter "
+    bruta.loc[1, "Obesity"] = "Unknown_Level"
+    with pytest.warns(UserWarning) as avisos:
+        df = preprocessar_base(bruta)
+    mensagens = sorted(str(aviso.message) for aviso in avisos)
+    assert mensagens[0].startswith("MTRANS:") and "Scooter" in mensagens[0]
+    assert mensagens[1].startswith("Obesity_level:")
+    assert df.loc[0, "MTRANS"] == "Scooter"
+    assert df.loc[1, "Obesity_level"] == "Unknown_Level"
+    assert df["MTRANS"].cat.categories[-1] == "Scooter"
+
+
+def test_ausentes_continuam_ausentes(bruta, recwarn):
+    bruta.loc[2, "Gender"] = np.nan
+    df = preprocessar_base(bruta)
+    assert pd.isna(df.loc[2, "Gender"])
+    assert not recwarn.list
+
+
+def test_manifesto_so_gravado_quando_o_arquivo_muda(tmp_path):
+    dados = tmp_path / "Obesity.csv"
+    dados.write_bytes(CAMINHO_BASE.read_bytes())
+    cache_dir = tmp_path / ".cache"
+    chave = chave_base_processada(dados, cache_dir=cache_dir)
+    manifesto = cache_dir / "manifesto.json"
+    assinatura = manifesto.stat().st_mtime_ns
+
+    for _ in range(3):
+        assert chave_base_processada(dados, cache_dir=cache_dir) == chave
+    assert manifesto.stat().st_mtime_ns == assinatura
+
+    dados.write_bytes(CAMINHO_BASE.read_bytes() + CAMINHO_BASE.read_bytes()[-200:])
+    assert chave_base_processada(dados, cache_dir=cache_dir) != chave
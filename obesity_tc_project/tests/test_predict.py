@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import pandas as pd
+from joblib import dump, load
+
+from src.obesity_tc.predict import COLUNA_PREDICAO, carregar_pipeline, pontuar_csv
+
+CAMINHO_BASE = Path(__file__).resolve().parents[1] / "data/raw/Obesity.csv"
+
+
+def _csv_so_cabecalho(tmp_path):
+    caminho = tmp_path / "vazio.csv"
+    caminho.write_text(CAMINHO_BASE.read_text().splitlines()[0] + "\n")
+    return caminho
+
+
+def test_csv_so_com_cabecalho(tmp_path, bundle):
+    entrada = _csv_so_cabecalho(tmp_path)
+    saida = tmp_path / "saida.csv"
+    total = pontuar_csv(entrada, saida, model_path=bundle["caminho"])
+    assert total == 0
+    df = pd.read_csv(saida)
+    assert df.empty
+    assert list(df.columns) == [*pd.read_csv(entrada).columns, COLUNA_PREDICAO]
+
+
+def test_csv_so_com_cabecalho_com_workers(tmp_path, bundle):
+    saida = tmp_path / "saida.csv"
+    total = pontuar_csv(
+        _csv_so_cabecalho(tmp_path), saida, model_path=bundle["caminho"], workers=2
+    )
+    assert total == 0
+    assert pd.read_csv(saida).columns[-1] == COLUNA_PREDICAO
+
+
+def test_pontua_em_blocos(tmp_path, bundle):
+    entrada = tmp_path / "entrada.csv"
+    pd.read_csv(CAMINHO_BASE).head(25).to_csv(entrada, index=False)
+    saida = tmp_path / "saida.csv"
+    total = pontuar_csv(entrada, saida, model_path=bundle["caminho"], chunksize=10)
+    assert total == 25
+    assert pd.read_csv(saida)[COLUNA_PREDICAO].notna().all()
+
+
+def test_n_jobs_salvo_mantido_no_proprio_processo(tmp_path, bundle):
+    pacote = load(bundle["caminho"])
+    pacote["pipeline"].named_steps["model"].n_jobs = -1
+    caminho = tmp_path / "modelo.joblib"
+    dump(pacote, caminho)
+    assert carregar_pipeline(caminho).named_steps["model"].n_jobs == -1
+    # Nos workers do pool cada processo usa um núcleo só.
+    assert carregar_pipeline(caminho, n_jobs=1).named_steps["model"].n_jobs == 1
@@ -0,0 +1,23 @@
+import numpy as np
+from joblib import load
+
+from src.obesity_tc.make_dataset import preprocessar_base
+from src.obesity_tc.prediction_cache import CachePredicoes
+
+
+def test_linha_com_ausentes_passa_pelo_cache(bundle):
+    pipe = load(bundle["caminho"])["pipeline"]
+    entradas = bundle["teste"].head(4).drop(columns="BMI")
+    entradas = entradas.astype({c: object for c in entradas.select_dtypes("category")})
+    entradas.iloc[0, entradas.columns.get_loc("FCVC")] = np.nan
+    entradas.iloc[0, entradas.columns.get_loc("MTRANS")] = None
+    entradas = preprocessar_base(entradas)
+
+    cache = CachePredicoes(bundle["caminho"])
+    chave = cache.chave(entradas.iloc[0].to_dict())
+    assert chave == cache.chave({**entradas.iloc[0].to_dict(), "FCVC": None})
+
+    esperado = pipe.predict(entradas)
+    np.testing.assert_array_equal(cache.prever(pipe, entradas), esperado)
+    np.testing.assert_array_equal(cache.prever(pipe, entradas), esperado)
+    assert cache.estatisticas()["acertos"] == len(entradas)
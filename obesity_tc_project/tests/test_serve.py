@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+
+from src.obesity_tc.make_dataset import COLUNAS_ENTRADA
+from src.obesity_tc.serve import MicroLote, atender_conexao, validar_registros
+
+
+@pytest.fixture
+def registro(base_limpa):
+    linha = base_limpa[COLUNAS_ENTRADA].iloc[0]
+    return {c: (v.item() if hasattr(v, "item") else str(v)) for c, v in linha.items()}
+
+
+def test_validar_converte_numericos(registro):
+    registro["Age"] = "21"
+    assert validar_registros(registro)[0]["Age"] == 21.0
+
+
+@pytest.mark.parametrize("valor", ["abc", None, True, float("nan"), [1]])
+def test_validar_rejeita_numerico_invalido(registro, valor):
+    registro["Age"] = valor
+    with pytest.raises(ValueError, match="Age"):
+        validar_registros(registro)
+
+
+def test_validar_rejeita_categorico_nao_texto(registro):
+    registro["Gender"] = 1
+    with pytest.raises(ValueError, match="Gender"):
+        validar_registros(registro)
+
+
+class _PreditorFragil:
+    # Falha em qualquer lote que contenha o marcador, como um predict real faria.
+    def predict(self, df: pd.DataFrame):
+        if (df["Age"] == 999).any():
+            raise RuntimeError("lote inválido")
+        return ["ok"] * len(df)
+
+
+def test_falha_isolada_no_micro_lote(registro):
+    async def cenario():
+        lote = MicroLote(_PreditorFragil(), max_espera_ms=50)
+        tarefa = asyncio.create_task(lote.executar())
+        ruim = {**registro, "Age": 999}
+        resultados = await asyncio.gather(
+            lote.prever([registro]),
+            lote.prever([ruim]),
+            lote.prever([registro, registro]),
+            return_exceptions=True,
+        )
+        tarefa.cancel()
+        return resultados
+
+    bom, ruim, dois = asyncio.run(cenario())
+    assert bom == ["ok"] and dois == ["ok", "ok"]
+    assert isinstance(ruim, RuntimeError)
+
+
+def _requisicao(corpo: bytes) -> bytes:
+    return (
+        b"POST /predict HTTP/1.1\r\nContent-Length: %d\r\nConnection: close\r\n\r\n"
+        % len(corpo)
+        + corpo
+    )
+
+
+@pytest.mark.parametrize(
+    ("mutacao", "status"),
+    [({}, b"200"), ({"Age": "abc"}, b"400"), ({"Age": 999}, b"500")],
+)
+def test_toda_requisicao_recebe_resposta(registro, mutacao, status):
+    async def cenario():
+        lote = MicroLote(_PreditorFragil())
+        tarefa = asyncio.create_task(lote.executar())
+        servidor = await asyncio.start_server(
+            lambda r, w: atender_conexao(lote, r, w), "127.0.0.1", 0
+        )
+        porta = servidor.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+        writer.write(_requisicao(json.dumps({**registro, **mutacao}).encode()))
+        resposta = await reader.read()
+        writer.close()
+        servidor.close()
+        tarefa.cancel()
+        return resposta
+
+    assert asyncio.run(cenario()).split(b" ")[1] == status